@@ -3,6 +3,12 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+This is the production entry point. The history, stats and delete views
+are async, so serve it with an ASGI server instead of ``runserver``::
+
+    pip install uvicorn
+    uvicorn backend.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -12,5 +18,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Sob ASGI cada pedido abre a sua ligação e as persistentes nunca seriam reutilizadas
+# (ver DB_CONN_MAX_AGE em settings.py); usar o PgBouncer para as partilhar
+os.environ['DB_CONN_MAX_AGE'] = '0'
 
 application = get_asgi_application()
@@ -43,7 +43,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'emissions.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'emissions.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,6 +79,17 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections are closed after every request by default. DB_CONN_MAX_AGE (seconds, or None
+# for no limit) keeps them open between requests, but only for WSGI servers (runserver,
+# gunicorn), where each worker thread reuses its connection. Under ASGI Django opens a
+# connection per request thread and never reuses it, so persistent connections would pile
+# up until PostgreSQL hits max_connections; asgi.py forces 0. To pool connections under
+# uvicorn put PgBouncer in transaction mode in front of PostgreSQL and set
+# DB_POOLER=pgbouncer, which disables server-side cursors (they don't survive between
+# transactions there). Reused connections are checked first, so one dropped by the server
+# is replaced instead of failing the request.
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '0')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -85,15 +98,21 @@ DATABASES = {
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_POOLER') == 'pgbouncer',
     }
 }
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.sqlite3',
-#         'NAME': BASE_DIR / 'db.sqlite3',
-#     }
-# }
+# DB_ENGINE=sqlite usa uma base de dados local (útil para correr os benchmarks nos dois motores)
+if os.getenv('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        }
+    }
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -141,4 +160,48 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # For direct access
     "http://frontend:3000",   # For Docker network
-]
\ No newline at end of file
+]
+
+# Emissions app
+# Bulk loader for uploads: "auto" (COPY on PostgreSQL, ORM otherwise), "copy" or "orm"
+EMISSIONS_BULK_LOADER = os.getenv('EMISSIONS_BULK_LOADER', 'auto')
+
+# Response cache for the file history and stats endpoints.
+# EMISSIONS_CACHE_BACKEND: "file" (default) or "memcached" are shared between workers, so an
+# upload or delete invalidates the cached responses of every worker. "locmem" is per process:
+# with several workers (uvicorn --workers 4) the others keep their copies until they expire,
+# so its entries only live for a minute unless EMISSIONS_CACHE_TIMEOUT says otherwise.
+EMISSIONS_CACHE_BACKEND = os.getenv('EMISSIONS_CACHE_BACKEND', 'file')
+EMISSIONS_CACHE_TIMEOUT = int(os.getenv(
+    'EMISSIONS_CACHE_TIMEOUT', 60 if EMISSIONS_CACHE_BACKEND == 'locmem' else 24 * 60 * 60
+))
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'emissions'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[EMISSIONS_CACHE_BACKEND]
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('EMISSIONS_CACHE_LOCATION', CACHE_LOCATION),
+    }
+}
+
+# Background imports (FileUploadView with ?async=1)
+EMISSIONS_IMPORT_WORKERS = int(os.getenv('EMISSIONS_IMPORT_WORKERS', 2))
+EMISSIONS_IMPORT_DIR = os.getenv('EMISSIONS_IMPORT_DIR', str(BASE_DIR / 'imports'))
+
+# Where the rows of new uploads are stored: "database" (CompanyEmissions), "parquet"
+# (only a compressed Parquet archive, needs pyarrow) or "both". Stats are computed from
+# the archive when there is one; the row-level endpoints (rows, top,
+# compare, patch) need the rows in the database and answer 400 for "parquet" files.
+EMISSIONS_ROW_STORAGE = os.getenv('EMISSIONS_ROW_STORAGE', 'database')
+EMISSIONS_ARCHIVE_DIR = os.getenv('EMISSIONS_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+
+# Request instrumentation: /api/metrics/ (Prometheus) only answers INTERNAL_IPS and localhost.
+# With EMISSIONS_PROFILE_DIR set, requests with ?profile=1 dump a cProfile .prof file there.
+INTERNAL_IPS = [ip for ip in os.getenv('INTERNAL_IPS', '').split(',') if ip]
+EMISSIONS_PROFILE_DIR = os.getenv('EMISSIONS_PROFILE_DIR')
@@ -16,12 +16,23 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from emissions.views import FileUploadView, FileHistoryView, FileStatsView, FileDeleteView
+from emissions.views import (
+    FileUploadView, FilePatchView, FileHistoryView, FileStatsView, FileDeleteView, ImportJobView,
+    CompanyEmissionsListView, TopCompaniesView, FileComparisonView, MetricsView,
+    TierThresholdsView,
+)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/upload-file/', FileUploadView.as_view(), name="upload"),
     path('api/files/', FileHistoryView.as_view(), name="history"),
     path('api/files/<int:file_id>/stats/', FileStatsView.as_view(), name='stats'),
+    path('api/files/<int:file_id>/emissions/', CompanyEmissionsListView.as_view(), name='emissions'),
+    path('api/files/<int:file_id>/top/', TopCompaniesView.as_view(), name='top'),
+    path('api/files/<int:file_id>/patch/', FilePatchView.as_view(), name='patch'),
     path('api/files/<int:file_id>/delete/', FileDeleteView.as_view(), name='delete'),
+    path('api/compare/', FileComparisonView.as_view(), name='compare'),
+    path('api/tiers/', TierThresholdsView.as_view(), name='tiers'),
+    path('api/jobs/<int:job_id>/', ImportJobView.as_view(), name='job'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+
+
+# Prefixo usado nas chaves dos tiers -> coluna com os valores por empresa
+METRICS = {
+    'co2': 'emissions',
+    'energy': 'consumption',
+}
+TIERS = ('high', 'medium', 'low')
+
+
+def _group_indices(keys):
+    # Posições de cada grupo, sem passar pelo groupby do pandas
+    codes, uniques = pd.factorize(keys)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return codes, uniques, [order[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def assign_tiers(frame, group='year'):
+    """
+    Classify each company in `frame` into a high/medium/low tier per metric.
+
+    Thresholds are the exact 75th and 50th percentiles (`np.percentile`)
+    of each group, and classification follows the original rules: a value
+    `>=` the 75th percentile is high, `>=` the 50th is medium, anything
+    else is low. The comparison itself is a single `np.select` over the
+    whole column.
+
+    Args:
+        frame (pd.DataFrame): One row per company and group, with
+            `emissions` and `consumption` columns.
+        group (str): The column that thresholds are computed over.
+
+    Returns:
+        pd.DataFrame: A copy of `frame` with categorical `co2_tier` and
+            `energy_tier` columns.
+    """
+    frame = frame.copy()
+    _, _, indices = _group_indices(frame[group])
+    for prefix, column in METRICS.items():
+        values = frame[column].to_numpy(dtype='float64')
+        high = np.empty_like(values)
+        medium = np.empty_like(values)
+        for idx in indices:
+            high[idx], medium[idx] = np.percentile(values[idx], [75, 50])
+        codes = np.select([values >= high, values >= medium], [0, 1], 2)
+        frame[f'{prefix}_tier'] = pd.Categorical.from_codes(codes, TIERS)
+    return frame
+
+
+def _by_name(frame):
+    # Ordem dos nomes, como o ciclo original (`sorted(companies.items())`)
+    return frame.iloc[np.argsort(frame['name'].to_numpy(dtype=object), kind='stable')]
+
+
+def tier_totals(frame, group='year'):
+    """
+    Sum emissions and consumption per tier for every group.
+
+    Companies are added one at a time in name order, like the original
+    loop: `np.bincount` accumulates its weights sequentially, so the
+    floats match the original to the last bit.
+
+    Args:
+        frame (pd.DataFrame): The output of `assign_tiers`, with a `name`
+            column.
+        group (str): The grouping column.
+
+    Returns:
+        dict: `{group: {'co2_high': ..., ..., 'energy_low': ...}}`. Empty
+            tiers are reported as `0`, like the original loop.
+    """
+    frame = _by_name(frame)
+    codes, uniques, _ = _group_indices(frame[group])
+    size = len(uniques) * len(TIERS)
+    result = {key: {} for key in uniques}
+    for prefix, column in METRICS.items():
+        bins = codes * len(TIERS) + frame[f'{prefix}_tier'].cat.codes.to_numpy()
+        sums = np.bincount(bins, weights=frame[column].to_numpy(dtype='float64'), minlength=size)
+        counts = np.bincount(bins, minlength=size)
+        for i, key in enumerate(uniques):
+            for j, tier in enumerate(TIERS):
+                b = i * len(TIERS) + j
+                result[key][f'{prefix}_{tier}'] = float(sums[b]) if counts[b] else 0
+    return result
+
+
+def sector_totals(frame, memberships, group='year'):
+    """
+    Sum company totals per sector for every group.
+
+    A company listed under several sectors counts its full total in each
+    of them. Energy totals are stored under `"{sector}_energy"`. As in
+    `tier_totals`, companies are added sequentially in name order (a
+    pandas `groupby().sum()` would round differently).
+
+    Args:
+        frame (pd.DataFrame): One row per company and group.
+        memberships (pd.DataFrame): One row per (group, name, sector).
+        group (str): The grouping column.
+
+    Returns:
+        dict: `{group: {sector: emissions, f"{sector}_energy": consumption}}`.
+    """
+    merged = _by_name(memberships[[group, 'name', 'sector']].merge(
+        frame[[group, 'name', 'emissions', 'consumption']], on=[group, 'name']
+    ))
+    if merged.empty:
+        return {}
+    codes, uniques = pd.factorize(pd.MultiIndex.from_arrays([merged[group], merged['sector']]), sort=True)
+    emissions = np.bincount(codes, weights=merged['emissions'].to_numpy(dtype='float64'), minlength=len(uniques))
+    consumption = np.bincount(codes, weights=merged['consumption'].to_numpy(dtype='float64'), minlength=len(uniques))
+    result = {}
+    for (key, sector), total, energy in zip(uniques, emissions.tolist(), consumption.tolist()):
+        result.setdefault(key, {})
+        result[key][sector] = total
+        result[key][f"{sector}_energy"] = energy
+    return result
+
+
+def primary_sectors(memberships, group='year'):
+    """
+    Pick the sector reported for each company in a group.
+
+    A company listed under several sectors is labelled with the sector
+    holding most of its emissions in the group, ties going to the first
+    sector name alphabetically: the same rule as `stats.top_companies`,
+    so a company has one label on every endpoint. (The original picked
+    the first element of a `set`, which depends on the hash seed.)
+
+    Args:
+        memberships (pd.DataFrame): One row per (group, name, sector),
+            with the company's `sector_emissions` in that sector.
+
+    Returns:
+        pd.Series: Sector names indexed by `(group, name)`.
+    """
+    keys = [group, 'name']
+    ranked = memberships.sort_values(['sector_emissions', 'sector'], ascending=[False, True], kind='stable')
+    return ranked.drop_duplicates(keys).set_index(keys)['sector']
+
+
+def _optional(value):
+    # NaN não é JSON válido
+    return None if np.isnan(value) else float(value)
+
+
+def _growth(current, previous):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(previous != 0, (current - previous) / previous, np.nan)
+
+
+def file_deltas(frame, file_ids):
+    """
+    Compare entity totals between consecutive files.
+
+    Args:
+        frame (pd.DataFrame): One row per (file_id, year, name) with
+            `emissions` and `consumption` columns.
+        file_ids (list): The files in chronological order.
+
+    Returns:
+        dict: `{name: {'by_file': [...], 'deltas': [...]}}`. Entities that
+            are missing from a file count as 0 there; percentage changes
+            from 0 are `None`.
+    """
+    totals = frame.groupby(['name', 'file_id'])[['emissions', 'consumption']].sum()
+    wide = {
+        column: totals[column].unstack('file_id').reindex(columns=file_ids).fillna(0)
+        for column in ('emissions', 'consumption')
+    }
+    names = wide['emissions'].index.tolist()
+    values = {column: wide[column].to_numpy() for column in wide}
+    diffs = {column: np.diff(v, axis=1) for column, v in values.items()}
+    growth = {column: _growth(v[:, 1:], v[:, :-1]) for column, v in values.items()}
+
+    return {
+        name: {
+            'by_file': [{
+                'file_id': file_id,
+                'emissions': float(values['emissions'][i, j]),
+                'consumption': float(values['consumption'][i, j]),
+            } for j, file_id in enumerate(file_ids)],
+            'deltas': [{
+                'from_file': file_ids[j],
+                'to_file': file_ids[j + 1],
+                'emissions': float(diffs['emissions'][i, j]),
+                'emissions_pct': _optional(growth['emissions'][i, j]),
+                'consumption': float(diffs['consumption'][i, j]),
+                'consumption_pct': _optional(growth['consumption'][i, j]),
+            } for j in range(len(file_ids) - 1)],
+        } for i, name in enumerate(names)
+    }
+
+
+def year_trends(frame, file_ids):
+    """
+    Build per-year series with YoY growth and CAGR for every entity.
+
+    When several files contain the same year, the most recent file (the
+    last one in `file_ids`) wins, so overlapping exports aren't counted
+    twice.
+
+    Returns:
+        dict: `{name: {'by_year': [...], 'emissions_cagr', 'consumption_cagr'}}`.
+    """
+    if frame.empty:
+        return {}
+    position = {file_id: i for i, file_id in enumerate(file_ids)}
+    frame = frame.assign(position=frame['file_id'].map(position))
+    latest = frame.groupby('year')['position'].transform('max')
+    frame = frame[frame['position'] == latest]
+
+    years = sorted(frame['year'].unique().tolist())
+    totals = frame.groupby(['name', 'year'])[['emissions', 'consumption']].sum()
+    wide = {
+        column: totals[column].unstack('year').reindex(columns=years).fillna(0)
+        for column in ('emissions', 'consumption')
+    }
+    names = wide['emissions'].index.tolist()
+    values = {column: wide[column].to_numpy() for column in wide}
+
+    # YoY do primeiro ano é indefinido; CAGR entre o primeiro e o último ano
+    span = years[-1] - years[0]
+    yoy = {}
+    cagr = {}
+    for column, v in values.items():
+        yoy[column] = np.hstack([np.full((len(v), 1), np.nan), _growth(v[:, 1:], v[:, :-1])])
+        cagr[column] = np.full(len(v), np.nan)
+        if span:
+            valid = v[:, 0] > 0
+            cagr[column][valid] = (v[valid, -1] / v[valid, 0]) ** (1 / span) - 1
+
+    return {
+        name: {
+            'by_year': [{
+                'year': str(year),
+                'emissions': float(values['emissions'][i, j]),
+                'consumption': float(values['consumption'][i, j]),
+                'emissions_yoy': _optional(yoy['emissions'][i, j]),
+                'consumption_yoy': _optional(yoy['consumption'][i, j]),
+            } for j, year in enumerate(years)],
+            'emissions_cagr': _optional(cagr['emissions'][i]),
+            'consumption_cagr': _optional(cagr['consumption'][i]),
+        } for i, name in enumerate(names)
+    }
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def install_query_counter(sender, connection, **kwargs):
+    from .instrumentation import count_queries
+
+    # connection_created volta a ser enviado quando a ligação é reaberta
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
 
 
 class EmissionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'emissions'
+
+    def ready(self):
+        connection_created.connect(install_query_counter)
@@ -0,0 +1,130 @@
+import os
+from django.conf import settings
+from .models import UploadedFile
+from .paths import archive_path, delete_archive
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional, só é preciso para guardar as linhas em Parquet
+    pa = pq = None
+
+
+# Colunas (já limpas) guardadas no arquivo, pela ordem do ficheiro
+ARCHIVE_COLUMNS = ['name', 'sector', 'energy_consumption', 'co2_emissions', 'year']
+COMPRESSION = 'zstd'
+
+
+def parquet_supported():
+    """Return True when pyarrow is installed."""
+    return pq is not None
+
+
+def get_storage_mode():
+    """
+    Resolve where the rows of a new upload are stored.
+
+    The `EMISSIONS_ROW_STORAGE` setting accepts `"database"`, `"parquet"`
+    or `"both"` (see `UploadedFile.STORAGE_CHOICES`).
+    """
+    mode = getattr(settings, 'EMISSIONS_ROW_STORAGE', UploadedFile.DATABASE)
+    if mode != UploadedFile.DATABASE and not parquet_supported():
+        raise ValueError("Parquet row storage requires the pyarrow package")
+    return mode
+
+
+class ArchiveWriter:
+    """
+    Write the cleaned chunks of an upload to its Parquet archive.
+
+    Each chunk becomes a row group, so only one chunk is held in memory at
+    a time. Names are dictionary-encoded and the file is compressed with
+    zstd. If the block exits with an exception the archive is removed.
+    """
+
+    def __init__(self, uploaded_file):
+        self.file_id = uploaded_file.pk
+        self.schema = pa.schema([
+            ('name', pa.string()),
+            ('sector', pa.string()),
+            ('energy_consumption', pa.float64()),
+            ('co2_emissions', pa.float64()),
+            ('year', pa.int64()),
+        ])
+        self.writer = None
+
+    def __enter__(self):
+        path = archive_path(self.file_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.writer = pq.ParquetWriter(path, self.schema, compression=COMPRESSION)
+        return self
+
+    def write(self, cleaned):
+        table = pa.Table.from_pandas(cleaned[ARCHIVE_COLUMNS], schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.writer.close()
+        if exc_type is not None:
+            delete_archive(self.file_id)
+        return False
+
+
+def read_archive(file_id, columns=None, filters=None):
+    """
+    Read the archived rows of a file into a DataFrame.
+
+    The Parquet file is memory-mapped and only `columns` are decoded;
+    `filters` (in `pyarrow.parquet` syntax) skip row groups and rows that
+    don't match.
+    """
+    return pq.read_table(archive_path(file_id), columns=columns, filters=filters, memory_map=True).to_pandas()
+
+
+def iter_archive(file_id, columns, year=None, batch_size=65_536):
+    """
+    Read the archived rows of a file as DataFrames of at most `batch_size` rows.
+
+    Batches come in file order. With `year`, row groups whose statistics
+    exclude it are skipped and the other rows of a batch are dropped, so
+    only one batch of the year is decoded at a time.
+    """
+    parquet = pq.ParquetFile(archive_path(file_id), memory_map=True)
+    row_groups = list(range(parquet.num_row_groups))
+    if year is not None:
+        column = parquet.schema_arrow.get_field_index('year')
+        row_groups = [
+            i for i in row_groups
+            if (stats := parquet.metadata.row_group(i).column(column).statistics) is None
+            or not stats.has_min_max or stats.min <= year <= stats.max
+        ]
+    read = columns if year is None or 'year' in columns else [*columns, 'year']
+    for batch in parquet.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=read):
+        frame = batch.to_pandas()
+        if year is not None:
+            frame = frame.loc[frame['year'] == year, columns]
+        if len(frame):
+            yield frame
+
+
+def archive_frames(file_id):
+    """
+    Aggregate a file's archived rows per (year, company).
+
+    Returns the same `(totals, memberships)` pair as
+    `stats.company_frames`, computed with pandas on the columnar file
+    instead of a `GROUP BY` over `CompanyEmissions`. Sector memberships
+    (with the company's emissions in each sector) keep their order of
+    first appearance in the file.
+    """
+    rows = read_archive(file_id)
+    totals = rows.groupby(['year', 'name'], sort=False)[['co2_emissions', 'energy_consumption']].sum()
+    totals = totals.reset_index().rename(columns={
+        'co2_emissions': 'emissions',
+        'energy_consumption': 'consumption',
+    })
+    memberships = rows.groupby(['year', 'name', 'sector'], sort=False)['co2_emissions'].sum()
+    memberships = memberships.rename('sector_emissions').reset_index()
+    totals['year'] = totals['year'].astype(str)
+    memberships['year'] = memberships['year'].astype(str)
+    return totals[['year', 'name', 'emissions', 'consumption']], memberships
@@ -0,0 +1,135 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+# Métricas comparadas com o baseline
+METRICS = ('seconds', 'peak_memory_mb', 'queries')
+
+
+def synthetic_dataframe(rows, companies=None, sectors=10, years=5, duplicates=0.0, seed=0):
+    """
+    Generate a raw DGEG-shaped DataFrame for benchmarks and tests.
+
+    Args:
+        rows (int): Number of rows to generate.
+        companies (int): Number of distinct companies (defaults to rows // years).
+        sectors (int): Number of distinct sectors.
+        years (int): Number of distinct years, starting at 2015.
+        duplicates (float): Fraction of the rows that repeat an earlier row
+            verbatim, as in workbooks where a company is listed twice.
+        seed (int): Random seed, so runs are reproducible.
+
+    Returns:
+        pd.DataFrame: A DataFrame with the columns expected by `FileUploadView`.
+    """
+    rng = np.random.default_rng(seed)
+    companies = companies or max(rows // years, 1)
+    unique = rows - int(rows * duplicates)
+    company_ids = rng.integers(0, companies, unique)
+    frame = pd.DataFrame({
+        "Empresa": pd.Series(company_ids).map("Empresa {}".format),
+        "Setor": pd.Series(company_ids % sectors).map("Setor {}".format),
+        "Consumo de Energia (MWh)": rng.lognormal(6, 1.5, unique).round(3),
+        "Emissões de CO2 (toneladas)": rng.lognormal(4, 1.5, unique).round(3),
+        "Ano": 2015 + rng.integers(0, years, unique),
+    })
+    if unique < rows:
+        repeated = frame.iloc[rng.integers(0, max(unique, 1), rows - unique)]
+        frame = pd.concat([frame, repeated], ignore_index=True)
+    return frame
+
+
+def synthetic_workbook(frame, fmt="xlsx"):
+    """
+    Serialize a DataFrame from `synthetic_dataframe` as an upload body.
+
+    Args:
+        frame (pd.DataFrame): The rows to write.
+        fmt (str): `"xlsx"` or `"csv"`.
+
+    Returns:
+        tuple: A `(name, content)` pair, with the file contents as bytes.
+    """
+    if fmt == "csv":
+        return "dgeg.csv", frame.to_csv(index=False).encode()
+    buffer = BytesIO()
+    frame.to_excel(buffer, index=False)
+    return "dgeg.xlsx", buffer.getvalue()
+
+
+@contextmanager
+def timed(results, key):
+    """Store the wall time (in seconds) of the wrapped block in `results[key]`."""
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
+
+
+@contextmanager
+def measure(results):
+    """
+    Store the wall time (`seconds`) and the number of SQL queries sent on
+    the current connection (`queries`) by the wrapped block in `results`.
+    Queries run by background workers aren't counted.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        yield
+        results['seconds'] = time.perf_counter() - start
+    results['queries'] = len(queries)
+
+
+@contextmanager
+def peak_memory(results):
+    """
+    Store the peak memory allocated by Python and numpy in the wrapped
+    block, in MB, in `results['peak_memory_mb']`.
+
+    `tracemalloc` slows the block down several times, so time it in a
+    separate run.
+    """
+    tracemalloc.start()
+    try:
+        yield
+        results['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def find_regressions(results, baseline, threshold=0.25, min_seconds=0.05):
+    """
+    Compare benchmark results with a stored baseline.
+
+    A metric regresses when it grew by more than `threshold` (a fraction)
+    over the baseline entry with the same endpoint and row count. Wall
+    time differences below `min_seconds` are ignored, since they are
+    mostly noise. Entries missing from the baseline aren't compared.
+
+    Args:
+        results (list): Result dicts with `endpoint`, `rows` and `METRICS`.
+        baseline (list): Result dicts in the same format.
+
+    Returns:
+        list: One message per regressed metric.
+    """
+    previous = {(entry['endpoint'], entry['rows']): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry['endpoint'], entry['rows']))
+        if before is None:
+            continue
+        for metric in METRICS:
+            old, new = before[metric], entry[metric]
+            if metric == 'seconds' and new - old < min_seconds:
+                continue
+            if new > old * (1 + threshold):
+                regressions.append(
+                    f"{entry['endpoint']} ({entry['rows']:,} rows): {metric} {old:.4g} -> {new:.4g}"
+                )
+    return regressions
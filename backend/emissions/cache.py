@@ -0,0 +1,115 @@
+import hashlib
+import time
+from django.core.cache import caches
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+
+HISTORY_KEY = "emissions:history"
+HISTORY_SCOPE = "history"
+
+# Incrementar quando o formato das entradas em cache muda
+CACHE_VERSION = 4
+
+
+def stats_key(file_id, summary=False, fmt='json'):
+    key = f"emissions:stats:{file_id}" + (":summary" if summary else "")
+    return key if fmt == 'json' else f"{key}:{fmt}"
+
+
+def file_scope(file_id):
+    return f"file:{file_id}"
+
+
+def generation_key(scope):
+    return f"emissions:generation:{scope}"
+
+
+def get_cache():
+    return caches[getattr(settings, 'EMISSIONS_CACHE_ALIAS', 'default')]
+
+
+def json_response(data, status=200):
+    """Render `data` with DRF's `JSONRenderer` into a plain `HttpResponse`."""
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def _generation(cache, scope):
+    key = generation_key(scope)
+    generation = await cache.aget(key, version=CACHE_VERSION)
+    if generation is None:
+        # sem geração (nunca invalidado ou expulso da cache): começa uma nova
+        await cache.aadd(key, time.time_ns(), None, version=CACHE_VERSION)
+        generation = await cache.aget(key, version=CACHE_VERSION)
+    return generation
+
+
+async def cached_response(request, key, build, scope):
+    """
+    Serve a GET response from the cache, with ETag/Last-Modified validators.
+
+    On a miss `await build()` is called; only 200 responses are stored,
+    already rendered, so a hit doesn't serialize the data again. The ETag
+    is a hash of the rendered JSON, so a client sending a matching
+    `If-None-Match` (or a recent enough `If-Modified-Since`) gets a 304
+    without the payload being re-sent.
+
+    Entries are stored under the current generation of `scope`, read
+    before building. Invalidating starts a new generation, so a response
+    built while an upload or delete commits is stored under the old one
+    and never served.
+
+    Args:
+        request: The incoming request.
+        key (str): The cache key (see `HISTORY_KEY` and `stats_key`).
+        build (callable): Coroutine function returning the `HttpResponse` to cache.
+        scope (str): What the response depends on (`HISTORY_SCOPE` or
+            `file_scope(file_id)`).
+
+    Returns:
+        The cached response, a freshly built one or a 304.
+    """
+    cache = get_cache()
+    key = f"{key}:{await _generation(cache, scope)}"
+    entry = await cache.aget(key, version=CACHE_VERSION)
+    if entry is None:
+        response = await build()
+        if response.status_code != 200:
+            return response
+        entry = {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+            'last_modified': timezone.now().timestamp(),
+        }
+        await cache.aset(key, entry, getattr(settings, 'EMISSIONS_CACHE_TIMEOUT', None), version=CACHE_VERSION)
+
+    last_modified = int(entry['last_modified'])
+    not_modified = get_conditional_response(request, etag=entry['etag'], last_modified=last_modified)
+    response = not_modified or HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(last_modified)
+    # Browsers may keep the response but must revalidate it with the ETag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _invalidate(*scopes):
+    # As entradas da geração anterior deixam de ser lidas e expiram sozinhas
+    generation = time.time_ns()
+    get_cache().set_many(
+        {generation_key(scope): generation for scope in scopes}, None, version=CACHE_VERSION
+    )
+
+
+def invalidate_history():
+    _invalidate(HISTORY_SCOPE)
+
+
+def invalidate_file(file_id):
+    """Drop every cached response that depends on `file_id`."""
+    _invalidate(HISTORY_SCOPE, file_scope(file_id))
@@ -0,0 +1,107 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from django.db import connection
+from django.db.models import Q
+from .ingestion import COLUMN_MAP
+
+
+# Colunas (já limpas) que entram no hash do conteúdo
+CONTENT_COLUMNS = list(COLUMN_MAP.values())
+
+
+def file_sha256(file_obj):
+    """
+    Hash the raw bytes of an uploaded file.
+
+    The file is read with `chunks()`, so large uploads are never loaded
+    into memory at once, and rewound afterwards so it can still be parsed.
+
+    Returns:
+        str: The hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for chunk in file_obj.chunks():
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+class ContentDigest:
+    """
+    Order-independent hash of the cleaned rows of a file.
+
+    Each row is hashed twice with `pd.util.hash_pandas_object` (two hash
+    keys, 128 bits per row). The row hashes of every chunk are kept, and
+    `hexdigest()` sorts them and hashes the sorted array with SHA-256, so
+    the digest covers the multiset of rows: the same data saved as CSV,
+    re-saved from Excel or with its rows reordered gets the same digest,
+    and any other set of rows gets a different one. Chunks are fed with
+    `update()` as they are loaded (16 bytes per row are kept in memory).
+
+    A file without valid rows has no content to compare, so its digest
+    is empty and it never matches another file.
+    """
+
+    # chaves (16 bytes) das duas funções de hash de cada linha
+    HASH_KEYS = ('emissions-row-a0', 'emissions-row-b1')
+
+    def __init__(self):
+        self.rows = 0
+        self.hashes = []
+
+    def update(self, cleaned):
+        content = cleaned[CONTENT_COLUMNS]
+        self.hashes.append(np.column_stack([
+            pd.util.hash_pandas_object(content, index=False, hash_key=key).to_numpy()
+            for key in self.HASH_KEYS
+        ]))
+        self.rows += len(content)
+
+    def hexdigest(self):
+        if not self.rows:
+            return ''
+        hashes = np.concatenate(self.hashes)
+        # ordem canónica: as linhas ordenadas pelos dois hashes
+        hashes = hashes[np.lexsort(hashes.T[::-1])]
+        return hashlib.sha256(np.ascontiguousarray(hashes, dtype='<u8').tobytes()).hexdigest()
+
+
+def find_duplicate(files, sha256=None, content_hash=None):
+    """
+    Find an existing upload with the same bytes or the same content.
+
+    Args:
+        files: The `UploadedFile` queryset to search (usually `ready_files()`).
+        sha256 (str): Matches the file's own hash or any of its aliases.
+        content_hash (str): Matches the normalized content hash.
+
+    Returns:
+        UploadedFile: The oldest match, or None.
+    """
+    if sha256:
+        files = files.filter(Q(sha256=sha256) | Q(aliases__sha256=sha256))
+    elif content_hash:
+        files = files.filter(content_hash=content_hash)
+    else:
+        return None
+    return files.order_by('pk').first()
+
+
+def lock_content(content_hash):
+    """
+    Serialize the imports of the same content until the transaction ends.
+
+    Call it inside the import's transaction, before `find_duplicate`. On
+    PostgreSQL it takes a transaction-level advisory lock keyed on the
+    content hash, so a second import of the same rows (another
+    `import_emissions` writer or run, or an upload) waits for the first
+    one to commit and then finds it as a duplicate. SQLite allows a
+    single writer, so there is nothing to lock.
+    """
+    if not content_hash or connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        # 60 bits do hash: cabe no bigint do pg_advisory_xact_lock
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [int(content_hash[:15], 16)])
@@ -0,0 +1,126 @@
+import glob
+import os
+import time
+import django
+from django.core.files import File
+from django.db import transaction
+from .archive import get_storage_mode
+from .cache import invalidate_history
+from .dedup import ContentDigest, file_sha256, find_duplicate, lock_content
+from .ingestion import CHUNK_SIZE, check_columns, clean_dataframe, open_table
+from .jobs import ready_files
+from .loaders import load_chunks
+from .models import UploadAlias, UploadedFile
+from .paths import delete_archive
+from .stats import materialize_stats
+
+
+# Ficheiros considerados quando é dada uma pasta ou um glob
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+
+def find_workbooks(patterns):
+    """
+    Expand directories and glob patterns into a sorted list of workbook paths.
+
+    A directory stands for the workbooks directly inside it; `**` in a
+    pattern matches subdirectories.
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*')
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path) and path.lower().endswith(WORKBOOK_EXTENSIONS):
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def workbook_sha256(path):
+    with File(open(path, 'rb'), name=path) as file_obj:
+        return file_sha256(file_obj)
+
+
+def init_worker():
+    # com o método spawn (macOS, Windows) os processos não herdam o Django já configurado
+    django.setup()
+
+
+def parse_workbook(path, chunk_size=CHUNK_SIZE):
+    """
+    Read and clean a workbook without touching the database.
+
+    Runs in a worker process of `import_emissions`. The header is checked
+    and the rows are cleaned exactly as in `FileUploadView`.
+
+    Returns:
+        dict: `path`, the cleaned `chunks`, `created` and `rejected` row
+            counts, `rejected_by_column`, the `content_hash` and the
+            parsing time in `seconds`.
+
+    Raises:
+        ValueError: If the file can't be read or lacks required columns.
+    """
+    start = time.perf_counter()
+    digest = ContentDigest()
+    parts = []
+    rejected = 0
+    rejected_by_column = {}
+    with File(open(path, 'rb'), name=path) as file_obj:
+        columns, chunks = open_table(file_obj, chunk_size)
+        check_columns(columns)
+        for chunk in chunks:
+            cleaned, chunk_rejected = clean_dataframe(chunk)
+            digest.update(cleaned)
+            parts.append(cleaned)
+            rejected += len(chunk) - len(cleaned)
+            for column, count in chunk_rejected.items():
+                rejected_by_column[column] = rejected_by_column.get(column, 0) + count
+    return {
+        'path': path,
+        'chunks': parts,
+        'created': sum(len(part) for part in parts),
+        'rejected': rejected,
+        'rejected_by_column': rejected_by_column,
+        'content_hash': digest.hexdigest(),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def store_workbook(parsed, sha256, mode=None):
+    """
+    Load a workbook parsed by `parse_workbook` as a new `UploadedFile`.
+
+    The file's rows and stats are written in a single transaction, one
+    batch per cleaned chunk, so a file is either fully imported or not at
+    all. A file with the same content as an existing one only gets an
+    `UploadAlias`, like a duplicate upload. The duplicate check and the
+    insert hold `lock_content`, so two writers importing the same content
+    at once (identical files in one batch, or concurrent runs) can't both
+    create it.
+
+    Returns:
+        tuple: `(uploaded_file, duplicate)`, where `duplicate` tells whether
+            `uploaded_file` is an existing file.
+    """
+    name = os.path.basename(parsed['path'])
+    uploaded_file = None
+    try:
+        with transaction.atomic():
+            lock_content(parsed['content_hash'])
+            duplicate = find_duplicate(ready_files(), content_hash=parsed['content_hash'])
+            if duplicate:
+                UploadAlias.objects.create(file=duplicate, name=name, sha256=sha256)
+                return duplicate, True
+
+            uploaded_file = UploadedFile.objects.create(
+                name=name, sha256=sha256, content_hash=parsed['content_hash'], storage=get_storage_mode()
+            )
+            load_chunks(parsed['chunks'], uploaded_file, mode, clean=False)
+            materialize_stats(uploaded_file)
+            transaction.on_commit(invalidate_history)
+    except Exception:
+        if uploaded_file is not None:
+            delete_archive(uploaded_file.pk)
+        raise
+    return uploaded_file, False
@@ -0,0 +1,198 @@
+import zipfile
+from itertools import chain, islice
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from .models import CompanyEmissions
+
+
+# Mapeamento entre as colunas do ficheiro DGEG e os campos de CompanyEmissions
+COLUMN_MAP = {
+    "Empresa": "name",
+    "Setor": "sector",
+    "Consumo de Energia (MWh)": "energy_consumption",
+    "Emissões de CO2 (toneladas)": "co2_emissions",
+    "Ano": "year",
+}
+
+REQUIRED_COLUMNS = set(COLUMN_MAP)
+
+TEXT_COLUMNS = ("Empresa", "Setor")
+NUMERIC_COLUMNS = ("Consumo de Energia (MWh)", "Emissões de CO2 (toneladas)")
+YEAR_COLUMN = "Ano"
+
+# Número de linhas lidas do ficheiro de cada vez
+CHUNK_SIZE = 50_000
+
+
+def check_columns(columns, required=REQUIRED_COLUMNS):
+    """
+    Raise a ValueError naming the required columns missing from a header.
+    """
+    missing_columns = required - set(columns)
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+
+def clean_dataframe(df):
+    """
+    Validate and coerce a raw DGEG DataFrame column by column.
+
+    Every column is converted in a single vectorized pass. Rows with a
+    missing company/sector, a non-numeric energy or emissions value, or a
+    missing/non-integer year are rejected instead of aborting the upload.
+
+    Args:
+        df (pd.DataFrame): The DataFrame as read from the uploaded file. It
+            must contain all of `REQUIRED_COLUMNS`.
+
+    Returns:
+        tuple: A `(cleaned, rejected)` pair where `cleaned` is a DataFrame
+            with the `CompanyEmissions` field names as columns and `rejected`
+            maps each source column to the number of rows it invalidated.
+    """
+    invalid = np.zeros(len(df), dtype=bool)
+    rejected = {}
+    cleaned = {}
+
+    for column in TEXT_COLUMNS:
+        mask = df[column].isna().to_numpy()
+        cleaned[COLUMN_MAP[column]] = df[column].astype(str)
+        rejected[column] = int(mask.sum())
+        invalid |= mask
+
+    for column in NUMERIC_COLUMNS:
+        values = pd.to_numeric(df[column], errors='coerce').astype('float64')
+        mask = ~np.isfinite(values.to_numpy())
+        cleaned[COLUMN_MAP[column]] = values
+        rejected[column] = int(mask.sum())
+        invalid |= mask
+
+    years = pd.to_numeric(df[YEAR_COLUMN], errors='coerce').astype('float64')
+    year_values = years.to_numpy()
+    mask = ~np.isfinite(year_values) | (np.mod(year_values, 1) != 0)
+    rejected[YEAR_COLUMN] = int(mask.sum())
+    invalid |= mask
+    cleaned[COLUMN_MAP[YEAR_COLUMN]] = years.where(~mask, 0).astype('int64')
+
+    cleaned = pd.DataFrame(cleaned, index=df.index)[~invalid]
+    return cleaned.reset_index(drop=True), rejected
+
+
+def build_instances(cleaned, uploaded_file):
+    """
+    Build unsaved `CompanyEmissions` instances from the cleaned columns.
+
+    Columns are converted to Python lists once and zipped together, which
+    avoids the per-row overhead of `DataFrame.iterrows()`.
+
+    Args:
+        cleaned (pd.DataFrame): The output of `clean_dataframe`, with the
+            `company_id` and `sector_id` columns added by the loader.
+        uploaded_file (UploadedFile): The file the rows belong to.
+
+    Returns:
+        list: The `CompanyEmissions` instances, ready for `bulk_create`.
+    """
+    return [
+        CompanyEmissions(
+            file=uploaded_file,
+            company_id=company_id,
+            sector_id=sector_id,
+            energy_consumption=energy,
+            co2_emissions=emissions,
+            year=year
+        ) for company_id, sector_id, energy, emissions, year in zip(
+            cleaned['company_id'].tolist(),
+            cleaned['sector_id'].tolist(),
+            cleaned['energy_consumption'].tolist(),
+            cleaned['co2_emissions'].tolist(),
+            cleaned['year'].tolist(),
+        )
+    ]
+
+
+def _header_names(header):
+    # Mesmo nome que o pandas dá a colunas sem cabeçalho
+    return [
+        str(value) if value is not None else f"Unnamed: {i}"
+        for i, value in enumerate(header)
+    ]
+
+
+def _open_xlsx(file_obj, chunk_size):
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    try:
+        columns = _header_names(next(rows))
+    except StopIteration:
+        workbook.close()
+        return [], iter(())
+
+    def chunks():
+        width = len(columns)
+        try:
+            non_empty = (
+                (tuple(r) + (None,) * width)[:width]
+                for r in rows if any(v is not None for v in r)
+            )
+            while True:
+                batch = list(islice(non_empty, chunk_size))
+                if not batch:
+                    break
+                yield pd.DataFrame(batch, columns=columns)
+        finally:
+            workbook.close()
+
+    return columns, chunks()
+
+
+def _open_xls(file_obj, chunk_size):
+    # O xlrd não tem modo de leitura em streaming, por isso o ficheiro é dividido depois de lido
+    df = pd.read_excel(file_obj, engine='xlrd')
+    chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+    return list(df.columns), chunks
+
+
+def _open_csv(file_obj, chunk_size):
+    reader = pd.read_csv(file_obj, chunksize=chunk_size)
+    try:
+        first = next(reader)
+    except StopIteration:
+        return [], iter(())
+    return list(first.columns), chain([first], reader)
+
+
+def open_table(file_obj, chunk_size=CHUNK_SIZE):
+    """
+    Open an uploaded Excel or CSV file for chunked reading.
+
+    `.xlsx` workbooks are read with openpyxl in read-only mode, row by row,
+    and CSV files are parsed in chunks, so memory use depends on
+    `chunk_size` rather than on the file size. Legacy `.xls` workbooks fall
+    back to xlrd.
+
+    Args:
+        file_obj: A binary file-like object (e.g. a Django `UploadedFile`).
+        chunk_size (int): Maximum number of rows per yielded DataFrame.
+
+    Returns:
+        tuple: A `(columns, chunks)` pair where `columns` is the header row
+            and `chunks` is an iterator of raw DataFrames.
+
+    Raises:
+        ValueError: If the file cannot be read as a spreadsheet.
+    """
+    name = (getattr(file_obj, 'name', None) or '').lower()
+    try:
+        if name.endswith('.csv'):
+            return _open_csv(file_obj, chunk_size)
+        file_obj.seek(0)
+        if zipfile.is_zipfile(file_obj):
+            file_obj.seek(0)
+            return _open_xlsx(file_obj, chunk_size)
+        file_obj.seek(0)
+        return _open_xls(file_obj, chunk_size)
+    except Exception as e:
+        raise ValueError("File is not a valid Excel document or is corrupted") from e
+
@@ -0,0 +1,179 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Métricas do pedido em curso (None fora de um pedido); o asgiref propaga-as para as threads do sync_to_async
+_current = ContextVar('emissions_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Time spent per span and SQL activity of a single request."""
+
+    def __init__(self):
+        self.spans = {}
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def server_timing(self, total):
+        """Format the request as a `Server-Timing` header value (durations in ms)."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.spans.items()]
+        entries.append(
+            f'db;desc="{self.queries} queries, {self.rows} rows";dur={self.db_seconds * 1000:.1f}'
+        )
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def _format_labels(labels):
+    return ",".join(
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"')) for name, value in labels
+    )
+
+
+class Histogram:
+    """A labelled Prometheus histogram, kept in process memory."""
+
+    def __init__(self, name, documentation, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self.lock:
+            # contagens por bucket (não cumulativas), número de observações e soma
+            counts, observations, total = self.series.get(key, ([0] * len(self.buckets), 0, 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.series[key] = (counts, observations + 1, total + value)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = sorted((key, (list(counts), observations, total))
+                            for key, (counts, observations, total) in self.series.items())
+        for key, (counts, observations, total) in series:
+            labels = _format_labels(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {observations}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {observations}")
+        return lines
+
+
+class Counter:
+    """A labelled Prometheus counter, kept in process memory."""
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            series = sorted(self.series.items())
+        for key, value in series:
+            lines.append(f"{self.name}{{{_format_labels(zip(self.labels, key))}}} {value}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'emissions_request_duration_seconds', "Request latency.", ('method', 'route', 'status')
+)
+SPAN_DURATION = Histogram(
+    'emissions_span_duration_seconds', "Time spent in each instrumented step.", ('span',)
+)
+SQL_QUERIES = Counter('emissions_sql_queries_total', "SQL queries run by requests.", ('route',))
+SQL_ROWS = Counter(
+    'emissions_sql_rows_total', "Rows returned by the SELECTs of requests (when the driver reports them).", ('route',)
+)
+
+REGISTRY = (REQUEST_DURATION, SPAN_DURATION, SQL_QUERIES, SQL_ROWS)
+
+
+def render_metrics():
+    """Return every metric in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
+
+
+def current_metrics():
+    """The `RequestMetrics` of the request being handled, or None."""
+    return _current.get()
+
+
+@contextmanager
+def track_request():
+    """Collect the `RequestMetrics` of the code run inside the block."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    """
+    Time a step of a request (e.g. `"parse"` or `"serialize"`).
+
+    The duration is added to the request's `Server-Timing` header and to
+    the `emissions_span_duration_seconds` histogram. A span entered
+    several times in one request (e.g. once per chunk) is summed.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        SPAN_DURATION.observe(seconds, span=name)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.add_span(name, seconds)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper that adds every query to the current request.
+
+    Installed on each connection by `EmissionsConfig.ready`. Rows are
+    taken from the cursor's `rowcount`, which PostgreSQL sets for SELECTs
+    and SQLite doesn't.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_seconds += time.perf_counter() - start
+        metrics.queries += 1
+        rowcount = getattr(context['cursor'], 'rowcount', -1)
+        if rowcount > 0 and sql.lstrip()[:6].upper() == 'SELECT':
+            metrics.rows += rowcount
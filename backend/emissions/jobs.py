@@ -0,0 +1,247 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.db.models import Subquery
+from django.utils import timezone
+from .cache import invalidate_history
+from .lazy import LazyModule
+from .models import CompanyEmissions, FileStats, ImportJob, UploadAlias, UploadedFile
+from .paths import delete_archive
+
+# Só as importações em background precisam do pandas; ready_files/hide_file ficam leves
+archive = LazyModule('emissions.archive')
+dedup = LazyModule('emissions.dedup')
+ingestion = LazyModule('emissions.ingestion')
+loaders = LazyModule('emissions.loaders')
+stats = LazyModule('emissions.stats')
+
+
+# Linhas removidas por cada DELETE quando um ficheiro é apagado
+PURGE_BATCH_SIZE = 50_000
+
+# Jobs ativos sem progresso há mais do que isto são dados como perdidos (ex.: reinício do worker)
+STALE_JOB_AGE = timedelta(minutes=15)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'EMISSIONS_IMPORT_WORKERS', 2),
+                thread_name_prefix='emissions-import',
+            )
+    return _executor
+
+
+def wait_for_workers():
+    """
+    Block until every queued background task has finished.
+
+    The pool is shut down and a new one is created on the next
+    `get_executor` call.
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def get_storage():
+    return FileSystemStorage(location=getattr(settings, 'EMISSIONS_IMPORT_DIR', settings.BASE_DIR / 'imports'))
+
+
+def ready_files():
+    """`UploadedFile`s that aren't hidden and whose import has finished (or never ran as a job)."""
+    return UploadedFile.objects.filter(hidden=False).exclude(
+        import_jobs__status__in=ImportJob.ACTIVE_STATUSES
+    )
+
+
+def create_import_job(file_obj):
+    """
+    Store an uploaded file on disk and queue it for a background import.
+
+    The job is handed to the worker pool once the current transaction
+    commits.
+
+    Returns:
+        ImportJob: The pending job.
+    """
+    storage = get_storage()
+    source = storage.save(os.path.basename(file_obj.name), file_obj)
+    job = ImportJob.objects.create(name=file_obj.name, source=source)
+    transaction.on_commit(lambda: get_executor().submit(_in_worker, run_import_job, job.id))
+    return job
+
+
+def run_import_job(job_id):
+    """
+    Parse and load the file of an `ImportJob`, recording its progress.
+
+    Chunks are committed one at a time so `rows_processed` can be polled
+    while the import runs; the new file is hidden from the file list
+    until the job succeeds. On failure the partially loaded file is
+    deleted and the error is stored on the job. If the loaded rows turn
+    out to match an existing file, the new copy is deleted and the job
+    points to the existing file through an `UploadAlias`.
+    """
+    # um job dado como perdido por recover_stale_jobs já não é corrido
+    if not ImportJob.objects.filter(pk=job_id, status=ImportJob.PENDING).update(
+        status=ImportJob.RUNNING, updated_at=timezone.now()
+    ):
+        return
+    job = ImportJob.objects.get(pk=job_id)
+    storage = get_storage()
+
+    def progress(created, rejected, rejected_by_column):
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=created + rejected,
+            rows_rejected=rejected,
+            updated_at=timezone.now(),
+        )
+
+    try:
+        digest = dedup.ContentDigest()
+        with storage.open(job.source, 'rb') as file_obj:
+            sha256 = dedup.file_sha256(file_obj)
+            columns, chunks = ingestion.open_table(file_obj)
+            ingestion.check_columns(columns)
+
+            job.file = UploadedFile.objects.create(name=job.name, sha256=sha256, storage=archive.get_storage_mode())
+            job.save(update_fields=['file', 'updated_at'])
+            created, rejected, rejected_by_column = loaders.load_chunks(
+                chunks, job.file, on_chunk=progress, digest=digest
+            )
+
+        loaded_file = job.file
+        content_hash = digest.hexdigest()
+        with transaction.atomic():
+            dedup.lock_content(content_hash)
+            duplicate = dedup.find_duplicate(ready_files(), content_hash=content_hash)
+            if duplicate:
+                # a cópia fica escondida e as linhas saem em lotes depois do commit
+                hide_file(loaded_file, purge=False)
+                job.file = duplicate
+                UploadAlias.objects.create(file=duplicate, name=job.name, sha256=sha256)
+            else:
+                job.file.content_hash = content_hash
+                job.file.save(update_fields=['content_hash'])
+                stats.materialize_stats(job.file)
+            job.status = ImportJob.SUCCEEDED
+            job.rows_processed = created + rejected
+            job.rows_rejected = rejected
+            job.rejected_by_column = rejected_by_column
+            job.save()
+        if duplicate:
+            purge_file(loaded_file.id)
+        invalidate_history()
+    except Exception as e:
+        failed_file = job.file
+        job.file = None
+        job.status = ImportJob.FAILED
+        job.error = str(e)
+        with transaction.atomic():
+            if failed_file is not None:
+                hide_file(failed_file, purge=False)
+            job.save()
+        if failed_file is not None:
+            purge_file(failed_file.id)
+    finally:
+        storage.delete(job.source)
+
+
+def recover_stale_jobs(older_than=STALE_JOB_AGE):
+    """
+    Fail the import jobs left pending or running by a worker that stopped.
+
+    Jobs run in the thread pool of the process that received the upload,
+    so a restart loses them. Active jobs whose `updated_at` (touched after
+    every chunk) is older than `older_than` are marked failed, their
+    partially loaded files are hidden and purged and their stored
+    uploads are removed.
+
+    Returns:
+        list: The ids of the jobs marked failed.
+    """
+    storage = get_storage()
+    cutoff = timezone.now() - older_than
+    stale = ImportJob.objects.filter(status__in=ImportJob.ACTIVE_STATUSES, updated_at__lt=cutoff)
+    recovered = []
+    for job in stale.select_related('file').order_by('pk'):
+        with transaction.atomic():
+            # o job pode ter avançado entretanto noutro processo
+            if not stale.filter(pk=job.pk).update(
+                status=ImportJob.FAILED, file=None, error="Interrupted by a worker restart",
+                updated_at=timezone.now(),
+            ):
+                continue
+            if job.file is not None:
+                hide_file(job.file, purge=False)
+        if job.file is not None:
+            purge_file(job.file.id)
+        if storage.exists(job.source):
+            storage.delete(job.source)
+        recovered.append(job.pk)
+    return recovered
+
+
+def hide_file(uploaded_file, purge=True):
+    """
+    Soft-delete a file and queue the removal of its rows.
+
+    This is a single-row `UPDATE` (plus the removal of the stored stats),
+    so it returns immediately whatever the size of the file; the file
+    disappears from every endpoint through `ready_files()`. With `purge`
+    the rows are removed by `purge_file` in the worker pool once the
+    current transaction commits.
+    """
+    uploaded_file.hidden = True
+    uploaded_file.save(update_fields=['hidden'])
+    FileStats.objects.filter(file=uploaded_file).delete()
+    if purge:
+        transaction.on_commit(lambda: get_executor().submit(_in_worker, purge_file, uploaded_file.id))
+
+
+def purge_file(file_id, batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete a file and its rows with set-based, bounded `DELETE`s.
+
+    Rows are removed `batch_size` at a time with `DELETE ... WHERE id IN
+    (SELECT id ... WHERE file_id = %s LIMIT n)`, each batch in its own
+    transaction, so no primary keys are loaded into Python and no single
+    transaction has to lock the whole file.
+
+    Returns:
+        int: The number of `CompanyEmissions` rows deleted.
+    """
+    rows = CompanyEmissions.objects.filter(file_id=file_id).order_by()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            count, _ = CompanyEmissions.objects.filter(
+                pk__in=Subquery(rows.values('pk')[:batch_size])
+            ).delete()
+        if not count:
+            break
+        deleted += count
+    UploadedFile.objects.filter(pk=file_id).delete()
+    delete_archive(file_id)
+    return deleted
+
+
+def _in_worker(task, *args):
+    try:
+        task(*args)
+    finally:
+        # cada thread do pool tem a sua própria ligação à base de dados
+        connection.close()
@@ -0,0 +1,22 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported on first attribute access.
+
+    The analytics modules import pandas, numpy and (optionally) pyarrow,
+    which take a good part of a worker's startup time. Views and jobs
+    refer to them through a `LazyModule`, so the light endpoints (file
+    history, delete) never load them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        # depois da primeira vez o import_module só consulta sys.modules
+        return getattr(importlib.import_module(self._name), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
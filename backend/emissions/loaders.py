@@ -0,0 +1,208 @@
+from contextlib import nullcontext
+from io import StringIO
+from django.conf import settings
+from django.db import connection
+from .archive import ArchiveWriter
+from .ingestion import build_instances, clean_dataframe
+from .instrumentation import span
+from .models import Company, CompanyEmissions, Sector, UploadedFile
+
+
+# Número de linhas enviadas por cada COPY / INSERT
+BATCH_SIZE = 50_000
+
+# Número máximo de nomes por cada `name__in` (limite de variáveis do sqlite)
+LOOKUP_BATCH_SIZE = 5_000
+
+COPY_FIELDS = ("file", "company", "sector", "energy_consumption", "co2_emissions", "year")
+
+
+def copy_supported(using=connection):
+    """Return True when the database supports `COPY ... FROM STDIN`."""
+    return using.vendor == 'postgresql'
+
+
+def get_loader_mode():
+    """
+    Resolve which bulk loader should be used for uploads.
+
+    The `EMISSIONS_BULK_LOADER` setting accepts `"auto"` (COPY on
+    PostgreSQL, ORM everywhere else), `"copy"` or `"orm"`.
+    """
+    mode = getattr(settings, 'EMISSIONS_BULK_LOADER', 'auto')
+    if mode == 'auto':
+        return 'copy' if copy_supported() else 'orm'
+    if mode == 'copy' and not copy_supported():
+        raise ValueError("COPY bulk loading requires a PostgreSQL database")
+    return mode
+
+
+def dimension_ids(model, names):
+    """
+    Map names to primary keys in a lookup table, creating missing rows.
+
+    Args:
+        model: `Company` or `Sector`.
+        names: An iterable of names.
+
+    Returns:
+        dict: `{name: id}` for every name in `names`.
+    """
+    names = list(set(names))
+    ids = {}
+    for start in range(0, len(names), LOOKUP_BATCH_SIZE):
+        batch = names[start:start + LOOKUP_BATCH_SIZE]
+        ids.update(model.objects.filter(name__in=batch).values_list('name', 'id'))
+        missing = [name for name in batch if name not in ids]
+        if missing:
+            # ignore_conflicts: outro upload pode ter criado o mesmo nome entretanto
+            model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+    return ids
+
+
+def attach_dimension_ids(cleaned):
+    """
+    Add `company_id` and `sector_id` columns to a cleaned DataFrame.
+
+    Names are resolved once per distinct value, not once per row.
+    """
+    return cleaned.assign(
+        company_id=cleaned['name'].map(dimension_ids(Company, cleaned['name'].unique())),
+        sector_id=cleaned['sector'].map(dimension_ids(Sector, cleaned['sector'].unique())),
+    )
+
+
+def _copy_statement():
+    meta = CompanyEmissions._meta
+    columns = [meta.get_field(f).column for f in COPY_FIELDS]
+    quote = connection.ops.quote_name
+    return "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        quote(meta.db_table), ", ".join(quote(c) for c in columns)
+    )
+
+
+def _copy_chunk(cursor, statement, buffer):
+    # psycopg2 expõe copy_expert, psycopg 3 expõe copy()
+    if hasattr(cursor, 'copy_expert'):
+        cursor.copy_expert(statement, buffer)
+    else:
+        with cursor.copy(statement) as copy:
+            copy.write(buffer.getvalue())
+
+
+def copy_rows(cleaned, uploaded_file, batch_size=BATCH_SIZE):
+    """
+    Stream cleaned rows into PostgreSQL with `COPY ... FROM STDIN`.
+
+    The CSV payload is rendered straight from the DataFrame columns, one
+    batch at a time, so no model instances are ever created.
+
+    Args:
+        cleaned (pd.DataFrame): The output of `attach_dimension_ids`.
+        uploaded_file (UploadedFile): The file the rows belong to.
+        batch_size (int): Rows per COPY statement.
+
+    Returns:
+        int: The number of rows loaded.
+    """
+    statement = _copy_statement()
+    columns = [CompanyEmissions._meta.get_field(f).attname for f in COPY_FIELDS]
+    with connection.cursor() as cursor:
+        for start in range(0, len(cleaned), batch_size):
+            chunk = cleaned.iloc[start:start + batch_size].assign(file_id=uploaded_file.pk)
+            buffer = StringIO()
+            chunk[columns].to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            _copy_chunk(cursor, statement, buffer)
+    return len(cleaned)
+
+
+def orm_rows(cleaned, uploaded_file, batch_size=BATCH_SIZE):
+    """
+    Insert cleaned rows with `bulk_create`, one batch at a time.
+
+    This is the portable fallback used on SQLite. Only one batch of model
+    instances is kept in memory at a time.
+    """
+    for start in range(0, len(cleaned), batch_size):
+        chunk = cleaned.iloc[start:start + batch_size]
+        CompanyEmissions.objects.bulk_create(build_instances(chunk, uploaded_file))
+    return len(cleaned)
+
+
+def load_rows(cleaned, uploaded_file, mode=None):
+    """
+    Persist cleaned rows for `uploaded_file` with the configured loader.
+
+    Must be called inside the upload transaction.
+    """
+    return write_rows(attach_dimension_ids(cleaned), uploaded_file, mode)
+
+
+def write_rows(cleaned, uploaded_file, mode=None):
+    """Like `load_rows`, for rows that already have their dimension ids."""
+    mode = mode or get_loader_mode()
+    if mode == 'copy':
+        return copy_rows(cleaned, uploaded_file)
+    return orm_rows(cleaned, uploaded_file)
+
+
+def load_chunks(chunks, uploaded_file, mode=None, on_chunk=None, digest=None, clean=True):
+    """
+    Clean and persist raw DataFrame chunks for `uploaded_file`.
+
+    Each chunk is cleaned and loaded before the next one is read, so only
+    one chunk is held in memory at a time. Uploads call this inside their
+    transaction; background import jobs call it outside one, so every
+    chunk is committed as soon as it is loaded.
+
+    Depending on `uploaded_file.storage`, rows are written to
+    `CompanyEmissions`, to the file's Parquet archive or to both.
+
+    Args:
+        chunks: An iterable of raw DataFrames, as returned by `open_table`.
+        uploaded_file (UploadedFile): The file the rows belong to.
+        mode (str): Optional loader override (`"copy"` or `"orm"`).
+        on_chunk (callable): Optional progress callback, called after each
+            chunk with the running `(created, rejected, rejected_by_column)`.
+        digest (ContentDigest): Optional content hash, updated with the
+            cleaned rows of every chunk.
+        clean (bool): Set to False for chunks that were already cleaned
+            with `clean_dataframe` (e.g. in another process).
+
+    Returns:
+        tuple: `(created, rejected, rejected_by_column)` counts.
+    """
+    mode = mode or get_loader_mode()
+    store_rows = uploaded_file.storage != UploadedFile.PARQUET
+    archive = ArchiveWriter(uploaded_file) if uploaded_file.storage != UploadedFile.DATABASE else nullcontext()
+    created = rejected = 0
+    rejected_by_column = {}
+    chunks = iter(chunks)
+    with archive as writer:
+        while True:
+            # os chunks são lidos do ficheiro à medida que são pedidos
+            with span('parse'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            if clean:
+                with span('validate'):
+                    cleaned, chunk_rejected = clean_dataframe(chunk)
+            else:
+                cleaned, chunk_rejected = chunk, {}
+            with span('insert'):
+                if store_rows:
+                    load_rows(cleaned, uploaded_file, mode)
+                if writer is not None:
+                    writer.write(cleaned)
+            if digest is not None:
+                digest.update(cleaned)
+            created += len(cleaned)
+            rejected += len(chunk) - len(cleaned)
+            for column, count in chunk_rejected.items():
+                rejected_by_column[column] = rejected_by_column.get(column, 0) + count
+            if on_chunk:
+                on_chunk(created, rejected, rejected_by_column)
+    return created, rejected, rejected_by_column
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from emissions.models import UploadedFile
+from emissions.stats import materialize_stats
+
+
+class Command(BaseCommand):
+    help = "Compute and store FileStats (and quantile sketches) for uploaded files that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Recompute stats for every file, not only the missing ones.",
+        )
+
+    def handle(self, *args, **options):
+        files = UploadedFile.objects.filter(hidden=False).order_by('id')
+        if not options['force']:
+            files = files.filter(Q(stats__isnull=True) | Q(sketches__isnull=True)).distinct()
+
+        count = 0
+        for uploaded_file in files.iterator():
+            with transaction.atomic():
+                materialize_stats(uploaded_file)
+            count += 1
+            self.stdout.write(f"Stored stats for file {uploaded_file.id} ({uploaded_file.name})")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled stats for {count} file(s)."))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from emissions.benchmarks import synthetic_dataframe, timed
+from emissions.ingestion import clean_dataframe
+from emissions.jobs import PURGE_BATCH_SIZE, hide_file, purge_file
+from emissions.loaders import load_rows
+from emissions.models import UploadedFile
+
+
+class Command(BaseCommand):
+    help = "Compare the latency of deleting files through the ORM cascade and the soft delete + batched purge."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+            help="Row counts to benchmark.",
+        )
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE)
+
+    def load(self, name, cleaned):
+        with transaction.atomic():
+            uploaded_file = UploadedFile.objects.create(name=name)
+            load_rows(cleaned, uploaded_file)
+        return uploaded_file
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>10} {'cascade (s)':>12} {'hide (s)':>10} {'purge (s)':>10}")
+        for rows in options['rows']:
+            cleaned, _ = clean_dataframe(synthetic_dataframe(rows))
+            results = {}
+
+            uploaded_file = self.load(f"benchmark-cascade-{rows}", cleaned)
+            with timed(results, 'cascade'), transaction.atomic():
+                uploaded_file.delete()
+
+            uploaded_file = self.load(f"benchmark-purge-{rows}", cleaned)
+            with timed(results, 'hide'), transaction.atomic():
+                hide_file(uploaded_file, purge=False)
+            with timed(results, 'purge'):
+                purge_file(uploaded_file.id, options['batch_size'])
+
+            self.stdout.write(
+                f"{rows:>10} {results['cascade']:>12.3f} {results['hide']:>10.4f} {results['purge']:>10.3f}"
+            )
@@ -0,0 +1,133 @@
+import json
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.core.files.uploadedfile import SimpleUploadedFile
+from emissions.benchmarks import (
+    find_regressions, measure, peak_memory, synthetic_dataframe, synthetic_workbook,
+)
+from emissions.jobs import wait_for_workers
+
+
+ENDPOINTS = ('upload', 'stats', 'delete')
+
+# Cache em memória, como a base de dados de teste: não mexe na cache do servidor
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark-endpoints',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure wall time, peak memory and query count of the upload, stats and delete endpoints "
+        "on synthetic DGEG workbooks, optionally failing on regressions against a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000],
+            help="Row counts to benchmark.",
+        )
+        parser.add_argument('--companies', type=int, help="Distinct companies (defaults to rows / years).")
+        parser.add_argument('--sectors', type=int, default=10)
+        parser.add_argument('--years', type=int, default=5)
+        parser.add_argument('--duplicates', type=float, default=0.0, help="Fraction of repeated rows.")
+        parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx', help="Upload file format.")
+        parser.add_argument('--output', help="Write the results as JSON to this path.")
+        parser.add_argument('--baseline', help="JSON results of a previous run to compare against.")
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help="Relative increase over the baseline that counts as a regression.",
+        )
+
+    def request(self, results, method, path, **kwargs):
+        with self.measure(results):
+            response = self.client.generic(method, path, **kwargs)
+        if response.status_code != 200:
+            raise CommandError(f"{method} {path} returned {response.status_code}: {response.content[:200]!r}")
+        return response
+
+    def scenario(self, body, results):
+        # upload -> stats -> delete do mesmo ficheiro
+        response = self.request(
+            results['upload'], 'POST', "/api/upload-file/", data=body, content_type=MULTIPART_CONTENT
+        )
+        file_id = response.json()['file_id']
+        self.request(results['stats'], 'GET', f"/api/files/{file_id}/stats/")
+        self.request(results['delete'], 'DELETE', f"/api/files/{file_id}/delete/")
+        # o purge corre em background; espera por ele para o ficheiro poder ser carregado outra vez
+        wait_for_workers()
+
+    def run(self, rows, options):
+        frame = synthetic_dataframe(
+            rows, companies=options['companies'], sectors=options['sectors'],
+            years=options['years'], duplicates=options['duplicates'],
+        )
+        name, content = synthetic_workbook(frame, options['format'])
+        # o corpo multipart é montado fora da medição
+        body = encode_multipart(BOUNDARY, {'file': SimpleUploadedFile(name, content)})
+        del frame, content
+
+        results = {endpoint: {} for endpoint in ENDPOINTS}
+        # a memória é medida numa primeira passagem, porque o tracemalloc atrasa muito o código
+        for self.measure in (peak_memory, measure):
+            self.scenario(body, results)
+        return results
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        self.client = Client()
+        # base de dados de teste vazia, para os resultados não dependerem dos dados existentes
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        caches = override_settings(CACHES=LOCMEM_CACHES)
+        caches.enable()
+        results = []
+        try:
+            self.stdout.write(
+                f"{'rows':>10} {'endpoint':>8} {'seconds':>10} {'peak (MB)':>10} {'queries':>8}"
+            )
+            for rows in options['rows']:
+                for endpoint, result in self.run(rows, options).items():
+                    results.append({'endpoint': endpoint, 'rows': rows, **result})
+                    self.stdout.write(
+                        f"{rows:>10} {endpoint:>8} {result['seconds']:>10.3f} "
+                        f"{result['peak_memory_mb']:>10.1f} {result['queries']:>8}"
+                    )
+        finally:
+            caches.disable()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'database': connection.vendor,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'options': {
+                key: options[key] for key in ('companies', 'sectors', 'years', 'duplicates', 'format')
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if baseline is None:
+            return
+        if baseline.get('database') != report['database'] or baseline.get('options') != report['options']:
+            self.stdout.write(self.style.WARNING(
+                "The baseline was recorded with a different database or workbook options."
+            ))
+        regressions = find_regressions(results, baseline['results'], options['threshold'])
+        if regressions:
+            raise CommandError("Performance regressions:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from emissions.benchmarks import synthetic_dataframe, timed
+from emissions.ingestion import clean_dataframe
+from emissions.loaders import attach_dimension_ids, copy_supported, copy_rows, orm_rows
+from emissions.models import UploadedFile
+
+
+class Command(BaseCommand):
+    help = "Compare the COPY and bulk_create upload loaders at several row counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+            help="Row counts to benchmark.",
+        )
+
+    def handle(self, *args, **options):
+        loaders = {'orm': orm_rows}
+        if copy_supported():
+            loaders['copy'] = copy_rows
+        else:
+            self.stdout.write(self.style.WARNING("COPY is only available on PostgreSQL, skipping it."))
+
+        self.stdout.write(f"{'rows':>10} {'loader':>6} {'seconds':>10} {'rows/s':>12}")
+        for rows in options['rows']:
+            cleaned, _ = clean_dataframe(synthetic_dataframe(rows))
+            cleaned = attach_dimension_ids(cleaned)
+            for name, loader in loaders.items():
+                results = {}
+                uploaded_file = UploadedFile.objects.create(name=f"benchmark-{name}-{rows}")
+                try:
+                    with timed(results, name), transaction.atomic():
+                        loader(cleaned, uploaded_file)
+                finally:
+                    uploaded_file.delete()
+                seconds = results[name]
+                self.stdout.write(f"{rows:>10} {name:>6} {seconds:>10.3f} {rows / seconds:>12,.0f}")
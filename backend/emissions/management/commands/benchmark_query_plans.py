@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, Min, Sum
+from emissions.benchmarks import synthetic_dataframe, timed
+from emissions.ingestion import clean_dataframe
+from emissions.loaders import load_rows
+from emissions.models import CompanyEmissions, UploadedFile
+from emissions.stats import compute_stats
+
+
+class Command(BaseCommand):
+    help = "Show the query plans and timings of the stats queries on a synthetic file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument(
+            '--no-analyze', action='store_true',
+            help="Only show the estimated plans (EXPLAIN without ANALYZE).",
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            uploaded_file = UploadedFile.objects.create(name=f"benchmark-plans-{rows}")
+            cleaned, _ = clean_dataframe(synthetic_dataframe(rows))
+            load_rows(cleaned, uploaded_file)
+
+        try:
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {CompanyEmissions._meta.db_table}")
+
+            queryset = CompanyEmissions.objects.filter(file_id=uploaded_file.id).order_by()
+            queries = {
+                'company totals': queryset.values('year', 'company_id').annotate(
+                    name=F('company__name'),
+                    emissions=Sum('co2_emissions'),
+                    consumption=Sum('energy_consumption'),
+                ),
+                'sector memberships': queryset.values('year', 'company_id', 'sector_id').annotate(
+                    name=F('company__name'),
+                    sector=F('sector__name'),
+                    sector_emissions=Sum('co2_emissions'),
+                    first_id=Min('id'),
+                ).order_by('first_id'),
+            }
+            explain = {}
+            if connection.vendor == 'postgresql' and not options['no_analyze']:
+                explain = {'analyze': True, 'buffers': True}
+
+            for label, query in queries.items():
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{label}:"))
+                self.stdout.write(query.explain(**explain))
+
+            results = {}
+            with timed(results, 'stats'):
+                compute_stats(uploaded_file.id)
+            self.stdout.write(f"compute_stats on {rows} rows: {results['stats']:.3f}s")
+        finally:
+            uploaded_file.delete()
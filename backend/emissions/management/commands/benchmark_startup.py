@@ -0,0 +1,69 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Corre num processo novo: tempo até o Django estar pronto e até à primeira resposta
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import backend.urls
+{imports}
+ready = time.perf_counter() - start
+from django.test import Client
+from django.test.utils import setup_test_environment
+setup_test_environment()
+status = Client().get({path!r}).status_code
+print(json.dumps({{
+    "ready": ready,
+    "first_response": time.perf_counter() - start,
+    "status": status,
+    "pandas": "pandas" in sys.modules,
+}}))
+"""
+
+# O que views.py importava antes de os módulos de análise serem carregados só quando precisos
+EAGER_IMPORTS = "import emissions.stats, emissions.loaders, emissions.patches, emissions.sketches"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker cold start (until Django is ready and until the first response) with the "
+        "analytics stack loaded lazily and eagerly. Database connection reuse depends on the server "
+        "and the network, so measure it with load_test against a running server instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts per variant.")
+        parser.add_argument(
+            '--path', default="/api/files/0/delete/",
+            help="First request (defaults to a 404 delete, one query, nothing cached).",
+        )
+
+    def cold_start(self, imports, path, runs):
+        script = STARTUP_SCRIPT.format(imports=imports, path=path)
+        results = []
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-c", script], cwd=settings.BASE_DIR, env=os.environ,
+                capture_output=True, text=True, check=True,
+            ).stdout
+            # a última linha é o JSON; antes podem vir avisos do Django
+            results.append(json.loads(output.strip().splitlines()[-1]))
+        return results
+
+    def handle(self, *args, **options):
+        path = options['path']
+        self.stdout.write(f"Cold start ({options['runs']} runs, median):")
+        self.stdout.write(f"{'variant':<10} {'ready (ms)':>11} {'first response (ms)':>20} {'pandas':>7}")
+        for name, imports in (('lazy', ''), ('eager', EAGER_IMPORTS)):
+            results = self.cold_start(imports, path, options['runs'])
+            ready = statistics.median(r['ready'] for r in results) * 1000
+            first = statistics.median(r['first_response'] for r in results) * 1000
+            self.stdout.write(f"{name:<10} {ready:>11.0f} {first:>20.0f} {str(results[0]['pandas']):>7}")
@@ -0,0 +1,52 @@
+import gzip
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from emissions.benchmarks import synthetic_dataframe, timed
+from emissions.ingestion import clean_dataframe
+from emissions.loaders import load_rows
+from emissions.middleware import BROTLI_QUALITY, brotli
+from emissions.models import UploadedFile
+from emissions.stats import materialize_stats, render_stats
+
+
+class Command(BaseCommand):
+    help = "Compare the size and encode time of the JSON and columnar MessagePack stats responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10_000, 100_000, 500_000],
+            help="Row counts to benchmark.",
+        )
+        parser.add_argument('--companies', type=int, default=None, help="Distinct companies (default: rows / 5).")
+        parser.add_argument('--repeat', type=int, default=3, help="Encodes per format (the best time is kept).")
+
+    def handle(self, *args, **options):
+        if brotli is None:
+            self.stdout.write(self.style.WARNING("brotli is not installed, skipping brotli sizes."))
+
+        self.stdout.write(
+            f"{'rows':>9} {'format':>8} {'encode (s)':>11} {'bytes':>12} {'gzip':>12} {'brotli':>12}"
+        )
+        for rows in options['rows']:
+            companies = options['companies'] or max(rows // 5, 1)
+            with transaction.atomic():
+                uploaded_file = UploadedFile.objects.create(name=f"benchmark-formats-{rows}")
+                cleaned, _ = clean_dataframe(synthetic_dataframe(rows, companies=companies))
+                load_rows(cleaned, uploaded_file)
+                file_stats = materialize_stats(uploaded_file)
+
+            try:
+                for fmt in ('json', 'msgpack'):
+                    times = []
+                    for _ in range(options['repeat']):
+                        results = {}
+                        with timed(results, fmt):
+                            content = render_stats(file_stats, fmt=fmt)
+                        times.append(results[fmt])
+                    gzipped = len(gzip.compress(content))
+                    brotli_size = len(brotli.compress(content, quality=BROTLI_QUALITY)) if brotli else "-"
+                    self.stdout.write(
+                        f"{rows:>9} {fmt:>8} {min(times):>11.3f} {len(content):>12,} {gzipped:>12,} {brotli_size:>12}"
+                    )
+            finally:
+                uploaded_file.delete()
@@ -0,0 +1,72 @@
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from emissions.analytics import assign_tiers, tier_totals
+from emissions.benchmarks import timed
+
+
+def loop_tier_totals(companies_by_year):
+    """The original per-company `if/elif` classification, used as the baseline."""
+    tier_data = defaultdict(lambda: defaultdict(int))
+    for year, companies in sorted(companies_by_year.items()):
+        emissions_values = [c['emissions'] for c in companies.values()]
+        consumption_values = [c['consumption'] for c in companies.values()]
+        co2_high = np.percentile(emissions_values, 75)
+        co2_medium = np.percentile(emissions_values, 50)
+        energy_high = np.percentile(consumption_values, 75)
+        energy_medium = np.percentile(consumption_values, 50)
+        for _, data in sorted(companies.items()):
+            if data['emissions'] >= co2_high:
+                tier_data[year]['co2_high'] += data['emissions']
+            elif data['emissions'] >= co2_medium:
+                tier_data[year]['co2_medium'] += data['emissions']
+            else:
+                tier_data[year]['co2_low'] += data['emissions']
+            if data['consumption'] >= energy_high:
+                tier_data[year]['energy_high'] += data['consumption']
+            elif data['consumption'] >= energy_medium:
+                tier_data[year]['energy_medium'] += data['consumption']
+            else:
+                tier_data[year]['energy_low'] += data['consumption']
+    return tier_data
+
+
+class Command(BaseCommand):
+    help = "Compare vectorized tier classification against the original per-company loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--companies', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+            help="Number of companies per year to benchmark.",
+        )
+        parser.add_argument('--years', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        self.stdout.write(f"{'companies':>10} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+        for companies in options['companies']:
+            rows = companies * options['years']
+            frame = pd.DataFrame({
+                'year': np.repeat([str(2015 + y) for y in range(options['years'])], companies),
+                'name': np.tile([f"Empresa {i}" for i in range(companies)], options['years']),
+                'emissions': rng.lognormal(4, 1.5, rows),
+                'consumption': rng.lognormal(6, 1.5, rows),
+            })
+            companies_by_year = defaultdict(dict)
+            for year, name, emissions, consumption in zip(
+                frame['year'].tolist(), frame['name'].tolist(),
+                frame['emissions'].tolist(), frame['consumption'].tolist()
+            ):
+                companies_by_year[year][name] = {'emissions': emissions, 'consumption': consumption}
+
+            results = {}
+            with timed(results, 'loop'):
+                loop_tier_totals(companies_by_year)
+            with timed(results, 'vectorized'):
+                tier_totals(assign_tiers(frame))
+
+            self.stdout.write(
+                f"{companies:>10} {results['loop']:>10.3f} {results['vectorized']:>15.3f} "
+                f"{results['loop'] / results['vectorized']:>7.1f}x"
+            )
@@ -0,0 +1,117 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from emissions.dedup import find_duplicate
+from emissions.importer import find_workbooks, init_worker, parse_workbook, store_workbook, workbook_sha256
+from emissions.ingestion import CHUNK_SIZE
+from emissions.jobs import ready_files
+
+
+def store_in_thread(parsed, sha256, mode):
+    start = time.perf_counter()
+    try:
+        return (*store_workbook(parsed, sha256, mode), time.perf_counter() - start)
+    finally:
+        # cada thread de escrita tem a sua própria ligação à base de dados
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Import every DGEG workbook in a directory or glob. Files are parsed in parallel "
+        "processes and written through a few database connections, one transaction per file. "
+        "Files that were already imported are skipped, so an interrupted import can be re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Directories or glob patterns (quote them) of workbooks.")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Processes parsing workbooks (defaults to the number of CPUs).",
+        )
+        parser.add_argument(
+            '--db-workers', type=int, default=2,
+            help="Threads, and so database connections, writing the parsed rows.",
+        )
+        parser.add_argument('--loader', choices=['copy', 'orm'], help="Override EMISSIONS_BULK_LOADER.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows per write batch.")
+
+    def handle(self, *args, **options):
+        paths = find_workbooks(options['paths'])
+        if not paths:
+            raise CommandError("No workbooks found")
+
+        if connection.vendor == 'sqlite' and options['db_workers'] > 1:
+            # o SQLite só aceita uma transação de escrita de cada vez
+            self.stdout.write(self.style.WARNING("SQLite allows a single writer, using --db-workers 1."))
+            options['db_workers'] = 1
+
+        queue = deque()
+        skipped = 0
+        for path in paths:
+            sha256 = workbook_sha256(path)
+            if find_duplicate(ready_files(), sha256=sha256):
+                skipped += 1
+                self.stdout.write(f"{os.path.basename(path)}: already imported, skipped")
+            else:
+                queue.append((path, sha256))
+
+        # ficheiros lidos ou à espera de escrita: limita as DataFrames em memória
+        window = options['workers'] + options['db_workers']
+        parsing = {}
+        writing = {}
+        imported = duplicates = rows = 0
+        failed = []
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as parsers, \
+                ThreadPoolExecutor(max_workers=options['db_workers']) as writers:
+            while queue or parsing or writing:
+                while queue and len(parsing) + len(writing) < window:
+                    path, sha256 = queue.popleft()
+                    parsing[parsers.submit(parse_workbook, path, options['chunk_size'])] = (path, sha256)
+
+                done, _ = wait([*parsing, *writing], return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in parsing:
+                        path, sha256 = parsing.pop(future)
+                        try:
+                            parsed = future.result()
+                        except Exception as e:
+                            failed.append(path)
+                            self.stderr.write(f"{os.path.basename(path)}: {e}")
+                            continue
+                        writing[writers.submit(store_in_thread, parsed, sha256, options['loader'])] = parsed
+                        continue
+
+                    parsed = writing.pop(future)
+                    name = os.path.basename(parsed['path'])
+                    try:
+                        uploaded_file, duplicate, write_seconds = future.result()
+                    except Exception as e:
+                        failed.append(parsed['path'])
+                        self.stderr.write(f"{name}: {e}")
+                        continue
+                    if duplicate:
+                        duplicates += 1
+                        self.stdout.write(f"{name}: same content as file {uploaded_file.id}, skipped")
+                        continue
+
+                    seconds = parsed['seconds'] + write_seconds
+                    imported += 1
+                    rows += parsed['created']
+                    self.stdout.write(
+                        f"{name}: file {uploaded_file.id}, {parsed['created']:,} rows "
+                        f"({parsed['rejected']:,} rejected) in {seconds:.1f}s, "
+                        f"{parsed['created'] / seconds:,.0f} rows/s"
+                    )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Imported {imported} files ({rows:,} rows) in {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s; "
+            f"{skipped + duplicates} skipped, {len(failed)} failed"
+        )
+        if failed:
+            raise CommandError(f"{len(failed)} files failed to import; fix them and run the command again")
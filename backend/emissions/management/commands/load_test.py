@@ -0,0 +1,70 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+import numpy as np
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Send concurrent GET requests to a running server and report p50/p99 latency per path."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default="http://127.0.0.1:8000", help="Base URL of the server.")
+        parser.add_argument(
+            '--path', dest='paths', action='append',
+            help="Path to request (repeatable). Defaults to /api/files/ and the stats of the first file.",
+        )
+        parser.add_argument('--clients', type=int, default=50, help="Number of concurrent clients.")
+        parser.add_argument('--requests', type=int, default=20, help="Requests per client and path.")
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def fetch(self, url, timeout):
+        start = time.perf_counter()
+        try:
+            with urlopen(url, timeout=timeout) as response:
+                response.read()
+                ok = response.status == 200
+        except (HTTPError, URLError, OSError):
+            ok = False
+        return time.perf_counter() - start, ok
+
+    def default_paths(self, base, timeout):
+        with urlopen(f"{base}/api/files/", timeout=timeout) as response:
+            files = json.loads(response.read())
+        paths = ["/api/files/"]
+        if files:
+            paths.append(f"/api/files/{files[0]['id']}/stats/")
+        return paths
+
+    def handle(self, *args, **options):
+        base = options['url'].rstrip('/')
+        paths = options['paths'] or self.default_paths(base, options['timeout'])
+        clients = options['clients']
+        per_client = options['requests']
+        barrier = threading.Barrier(clients)
+
+        def client(path):
+            # todos os clientes começam ao mesmo tempo
+            barrier.wait()
+            return [self.fetch(base + path, options['timeout']) for _ in range(per_client)]
+
+        self.stdout.write(
+            f"{'path':<32} {'requests':>9} {'errors':>7} {'req/s':>8} "
+            f"{'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}"
+        )
+        for path in paths:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=clients) as pool:
+                results = [r for batch in pool.map(client, [path] * clients) for r in batch]
+            elapsed = time.perf_counter() - started
+
+            latencies = np.array([latency for latency, _ in results]) * 1000
+            errors = sum(not ok for _, ok in results)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            self.stdout.write(
+                f"{path:<32} {len(results):>9} {errors:>7} {len(results) / elapsed:>8.1f} "
+                f"{p50:>9.1f} {p99:>9.1f} {latencies.max():>9.1f}"
+            )
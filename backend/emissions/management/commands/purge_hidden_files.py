@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from emissions.jobs import PURGE_BATCH_SIZE, purge_file
+from emissions.models import UploadedFile
+
+
+class Command(BaseCommand):
+    help = "Remove the rows of deleted (hidden) files that weren't purged yet, e.g. after a restart."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = 0
+        for file_id in UploadedFile.objects.filter(hidden=True).order_by('id').values_list('id', flat=True):
+            deleted = purge_file(file_id, options['batch_size'])
+            count += 1
+            self.stdout.write(f"Purged file {file_id} ({deleted} rows)")
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} file(s)."))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from emissions.jobs import STALE_JOB_AGE, recover_stale_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark import jobs left pending or running by a stopped worker as failed and remove their "
+        "partially loaded files. Run it when the server starts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes', type=float, default=STALE_JOB_AGE.total_seconds() / 60,
+            help="Only jobs without progress for this long (0 for every active job, when no worker is running).",
+        )
+
+    def handle(self, *args, **options):
+        recovered = recover_stale_jobs(timedelta(minutes=options['minutes']))
+        for job_id in recovered:
+            self.stdout.write(f"Job {job_id} marked as failed")
+
+        self.stdout.write(self.style.SUCCESS(f"Recovered {len(recovered)} job(s)."))
@@ -0,0 +1,129 @@
+import cProfile
+import os
+import re
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from .instrumentation import REQUEST_DURATION, SQL_QUERIES, SQL_ROWS, track_request
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional, sem ele as respostas vão em gzip
+    brotli = None
+
+
+ACCEPTS_BROTLI = re.compile(r"\bbr\b")
+
+# Qualidade 5: bem mais compacto que gzip com um custo de CPU parecido
+BROTLI_QUALITY = 5
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses with brotli when possible, gzip otherwise.
+
+    Brotli is used when the optional `brotli` package is installed and
+    the client sends `Accept-Encoding: br`; every other case (including
+    streaming responses) is handled by Django's `GZipMiddleware`.
+    """
+
+    def process_response(self, request, response):
+        if (
+            brotli is None
+            or response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < 200
+            or not ACCEPTS_BROTLI.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        # o corpo mudou, por isso o ETag deixa de ser forte (como no GZipMiddleware)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = "br"
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    Time every request and report where the time went.
+
+    Adds a `Server-Timing` header with the request's spans (see
+    `instrumentation.span`), its SQL queries, rows and time, and the
+    total, and records the latency and query counts behind
+    `/api/metrics/`. Metrics are labelled with the URL pattern, not the
+    path, so file IDs don't create new series.
+
+    When `EMISSIONS_PROFILE_DIR` is set, requests with `?profile=1` are
+    run under cProfile and the stats are dumped to a `.prof` file in that
+    directory (named in the `X-Profile` response header). Only the thread
+    that runs the middleware is profiled, so async views are best
+    profiled under `runserver`.
+
+    The middleware is sync and async capable: under ASGI it is awaited
+    in the event loop, so the async views are not run through a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # sob ASGI a cadeia é assíncrona: o middleware não pode obrigar a passar por uma thread
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profiler = self.start_profiler(request)
+        start = time.perf_counter()
+        with track_request() as metrics:
+            response = self.get_response(request)
+        return self.finish(request, response, metrics, time.perf_counter() - start, profiler)
+
+    async def __acall__(self, request):
+        profiler = self.start_profiler(request)
+        start = time.perf_counter()
+        with track_request() as metrics:
+            response = await self.get_response(request)
+        return self.finish(request, response, metrics, time.perf_counter() - start, profiler)
+
+    def finish(self, request, response, metrics, total, profiler):
+        if profiler is not None:
+            profiler.disable()
+            response["X-Profile"] = self.dump_profile(profiler, request)
+
+        match = request.resolver_match
+        route = match.route if match is not None else "unmatched"
+        REQUEST_DURATION.observe(total, method=request.method, route=route, status=response.status_code)
+        SQL_QUERIES.inc(metrics.queries, route=route)
+        SQL_ROWS.inc(metrics.rows, route=route)
+        response["Server-Timing"] = metrics.server_timing(total)
+        return response
+
+    def start_profiler(self, request):
+        if not getattr(settings, "EMISSIONS_PROFILE_DIR", None) or request.GET.get("profile") not in ("1", "true"):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def dump_profile(self, profiler, request):
+        directory = settings.EMISSIONS_PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = request.path.strip("/").replace("/", "_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}-{request.method}-{path}.prof"
+        profiler.dump_stats(os.path.join(directory, name))
+        return name
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-17 00:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emissions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileStats',
+            fields=[
+                ('file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='emissions.uploadedfile')),
+                ('payload', models.TextField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
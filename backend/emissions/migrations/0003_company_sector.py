@@ -0,0 +1,49 @@
+# Generated by Django 4.2.11 on 2026-10-17 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emissions', '0002_file_stats'),
+    ]
+
+    operations = [
+        # As colunas antigas passam a aceitar NULL para a migração poder ser revertida
+        migrations.AlterField(
+            model_name='companyemissions',
+            name='name',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='companyemissions',
+            name='sector',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Sector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='companyemissions',
+            name='company',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='emissions', to='emissions.company'),
+        ),
+        migrations.AddField(
+            model_name='companyemissions',
+            name='sector_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='emissions.sector'),
+        ),
+    ]
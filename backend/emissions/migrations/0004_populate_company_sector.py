@@ -0,0 +1,43 @@
+# Generated by Django 4.2.11 on 2026-10-17 09:12
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate(apps, schema_editor):
+    # Preenche as tabelas de empresas/setores e as FKs com um UPDATE por coluna
+    Company = apps.get_model('emissions', 'Company')
+    Sector = apps.get_model('emissions', 'Sector')
+    CompanyEmissions = apps.get_model('emissions', 'CompanyEmissions')
+
+    names = CompanyEmissions.objects.order_by().values_list('name', flat=True).distinct()
+    Company.objects.bulk_create([Company(name=name) for name in names.iterator()], batch_size=5000)
+    sectors = CompanyEmissions.objects.order_by().values_list('sector', flat=True).distinct()
+    Sector.objects.bulk_create([Sector(name=name) for name in sectors.iterator()], batch_size=5000)
+
+    CompanyEmissions.objects.update(
+        company=Subquery(Company.objects.filter(name=OuterRef('name')).values('pk')[:1]),
+        sector_ref=Subquery(Sector.objects.filter(name=OuterRef('sector')).values('pk')[:1]),
+    )
+
+
+def unpopulate(apps, schema_editor):
+    Company = apps.get_model('emissions', 'Company')
+    Sector = apps.get_model('emissions', 'Sector')
+    CompanyEmissions = apps.get_model('emissions', 'CompanyEmissions')
+
+    CompanyEmissions.objects.update(
+        name=Subquery(Company.objects.filter(pk=OuterRef('company')).values('name')[:1]),
+        sector=Subquery(Sector.objects.filter(pk=OuterRef('sector_ref')).values('name')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emissions', '0003_company_sector'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, unpopulate),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-17 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emissions', '0004_populate_company_sector'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='companyemissions',
+            name='name',
+        ),
+        migrations.RemoveField(
+            model_name='companyemissions',
+            name='sector',
+        ),
+        migrations.RenameField(
+            model_name='companyemissions',
+            old_name='sector_ref',
+            new_name='sector',
+        ),
+        migrations.AlterField(
+            model_name='companyemissions',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='emissions', to='emissions.company'),
+        ),
+        migrations.AlterField(
+            model_name='companyemissions',
+            name='sector',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='emissions', to='emissions.sector'),
+        ),
+        migrations.AddIndex(
+            model_name='companyemissions',
+            index=models.Index(fields=['file', 'year', 'company'], name='emissions_file_year_company'),
+        ),
+        migrations.AddIndex(
+            model_name='companyemissions',
+            index=models.Index(fields=['file', 'year', 'sector'], name='emissions_file_year_sector'),
+        ),
+    ]
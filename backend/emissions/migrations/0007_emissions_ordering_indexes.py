@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emissions', '0006_import_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='companyemissions',
+            index=models.Index(fields=['file', 'co2_emissions'], name='emissions_file_co2'),
+        ),
+        migrations.AddIndex(
+            model_name='companyemissions',
+            index=models.Index(fields=['file', 'energy_consumption'], name='emissions_file_energy'),
+        ),
+    ]
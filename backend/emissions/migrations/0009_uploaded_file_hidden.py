@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emissions', '0008_upload_dedup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-17 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emissions', '0009_uploaded_file_hidden'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='storage',
+            field=models.CharField(choices=[('database', 'Database'), ('parquet', 'Parquet'), ('both', 'Database and Parquet')], default='database', max_length=10),
+        ),
+    ]
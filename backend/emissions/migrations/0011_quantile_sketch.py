@@ -0,0 +1,27 @@
+# Generated by Django 4.2.11 on 2026-10-17 01:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emissions', '0010_uploaded_file_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuantileSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('payload', models.TextField()),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sketches', to='emissions.uploadedfile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='quantilesketch',
+            constraint=models.UniqueConstraint(fields=('file', 'year'), name='sketch_file_year'),
+        ),
+    ]
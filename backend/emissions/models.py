@@ -1,20 +1,119 @@
 from django.db import models
 
 class UploadedFile(models.Model):
+    # onde estão as linhas do ficheiro (ver EMISSIONS_ROW_STORAGE e emissions/archive.py)
+    DATABASE = "database"
+    PARQUET = "parquet"
+    BOTH = "both"
+    STORAGE_CHOICES = [
+        (DATABASE, "Database"),
+        (PARQUET, "Parquet"),
+        (BOTH, "Database and Parquet"),
+    ]
+
+    name = models.CharField(max_length=255)
+    upload_date = models.DateTimeField(auto_now_add=True)
+    # hashes usados para não voltar a importar o mesmo ficheiro (ver emissions/dedup.py)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # ficheiros apagados pelo frontend ficam escondidos até as linhas serem removidas em background
+    hidden = models.BooleanField(default=False)
+    storage = models.CharField(max_length=10, choices=STORAGE_CHOICES, default=DATABASE)
+
+    def __str__(self):
+        return self.name
+
+class UploadAlias(models.Model):
+    # upload repetido de um ficheiro que já existe: aponta para os dados do original
+    file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name="aliases")
     name = models.CharField(max_length=255)
+    sha256 = models.CharField(max_length=64, db_index=True)
     upload_date = models.DateTimeField(auto_now_add=True)
-    # adicionar atributo hidden para quando o user quiser apagar ficheiros pelo frontend
+
+    def __str__(self):
+        return f"{self.name} -> {self.file}"
+
+class Company(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class Sector(models.Model):
+    name = models.CharField(max_length=100, unique=True)
 
     def __str__(self):
         return self.name
 
 class CompanyEmissions(models.Model):
     file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name="emissions")
-    name = models.CharField(max_length=100)
-    sector = models.CharField(max_length=100)
+    # nomes de empresas e setores ficam em tabelas próprias, para as linhas serem mais pequenas
+    company = models.ForeignKey(Company, on_delete=models.PROTECT, related_name="emissions")
+    sector = models.ForeignKey(Sector, on_delete=models.PROTECT, related_name="emissions")
     energy_consumption = models.FloatField()
     co2_emissions = models.FloatField()
     year = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["file", "year", "company"], name="emissions_file_year_company"),
+            models.Index(fields=["file", "year", "sector"], name="emissions_file_year_sector"),
+            # paginação por cursor (keyset) ordenada por emissões/consumo
+            models.Index(fields=["file", "co2_emissions"], name="emissions_file_co2"),
+            models.Index(fields=["file", "energy_consumption"], name="emissions_file_energy"),
+        ]
     
     def __str__(self):
-        return f"{self.name} ({self.year})"
\ No newline at end of file
+        return f"{self.company} ({self.year})"
+
+class FileStats(models.Model):
+    # indicadores pré-calculados no upload, para o FileStatsView não ter de os recalcular
+    file = models.OneToOneField(UploadedFile, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    # guardado como texto (e não JSONField) para manter a ordem das chaves no jsonb do postgres
+    payload = models.TextField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.file}"
+
+class QuantileSketch(models.Model):
+    # t-digests dos totais por empresa de um ano (ver emissions/sketches.py), juntáveis entre ficheiros e anos
+    file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name="sketches")
+    year = models.IntegerField()
+    payload = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["file", "year"], name="sketch_file_year"),
+        ]
+
+    def __str__(self):
+        return f"Sketch for {self.file} ({self.year})"
+
+class ImportJob(models.Model):
+    # uploads processados em background (FileUploadView com ?async=1)
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+
+    name = models.CharField(max_length=255)
+    source = models.CharField(max_length=500)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    file = models.ForeignKey(UploadedFile, on_delete=models.SET_NULL, null=True, related_name="import_jobs")
+    rows_processed = models.IntegerField(default=0)
+    rows_rejected = models.IntegerField(default=0)
+    rejected_by_column = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
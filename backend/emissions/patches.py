@@ -0,0 +1,104 @@
+import pandas as pd
+from django.db import transaction
+from .ingestion import clean_dataframe
+from .loaders import LOOKUP_BATCH_SIZE, attach_dimension_ids, write_rows
+from .models import CompanyEmissions, UploadedFile
+from .paths import delete_archive
+from .stats import company_frames, patch_stats
+
+
+# Chave usada para decidir que linhas de um patch substituem linhas existentes
+PATCH_KEY = ['year', 'company_id', 'sector_id']
+
+
+def _pair_frames(file_id, pairs):
+    # company_frames só das empresas/anos afetados (e não do produto cartesiano)
+    totals, memberships = company_frames(
+        file_id,
+        years=[int(year) for year in pairs['year'].unique().tolist()],
+        company_ids=pairs['company_id'].unique().tolist(),
+    )
+    index = pd.MultiIndex.from_frame(pairs[['year', 'name']])
+    return tuple(
+        frame[pd.MultiIndex.from_frame(frame[['year', 'name']]).isin(index)].reset_index(drop=True)
+        for frame in (totals, memberships)
+    )
+
+
+def apply_patch(uploaded_file, chunks, mode=None):
+    """
+    Upsert the rows of a patch file into an existing `UploadedFile`.
+
+    Rows are matched on (year, company, sector): every existing row with
+    the same key as a patch row is deleted and the patch rows are
+    inserted, so a corrected figure replaces the old one and new
+    companies or years are added. Only the affected (year, company)
+    pairs are read back to update the stored stats with `patch_stats`.
+
+    The file's hashes and aliases are cleared, since its content no
+    longer matches the original upload, and a Parquet archive kept next
+    to the rows is dropped, so stats come from the patched rows from
+    then on. Must be called inside a transaction.
+
+    Args:
+        uploaded_file (UploadedFile): The file to patch.
+        chunks: An iterable of raw DataFrames, as returned by `open_table`.
+        mode (str): Optional loader override (`"copy"` or `"orm"`).
+
+    Returns:
+        dict: `created`, `replaced`, `rejected`, `rejected_by_column` and
+            the affected `years`.
+    """
+    parts = []
+    rejected = 0
+    rejected_by_column = {}
+    for chunk in chunks:
+        cleaned, chunk_rejected = clean_dataframe(chunk)
+        parts.append(cleaned)
+        rejected += len(chunk) - len(cleaned)
+        for column, count in chunk_rejected.items():
+            rejected_by_column[column] = rejected_by_column.get(column, 0) + count
+
+    result = {
+        'created': 0,
+        'replaced': 0,
+        'rejected': rejected,
+        'rejected_by_column': rejected_by_column,
+        'years': [],
+    }
+    cleaned = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    if cleaned.empty:
+        return result
+
+    cleaned = attach_dimension_ids(cleaned)
+    keys = cleaned[PATCH_KEY].drop_duplicates()
+    pairs = cleaned[['year', 'company_id', 'name']].drop_duplicates().astype({'year': str})
+    before = _pair_frames(uploaded_file.id, pairs)
+
+    existing = pd.DataFrame.from_records(
+        CompanyEmissions.objects.filter(
+            file=uploaded_file,
+            year__in=keys['year'].unique().tolist(),
+            company_id__in=keys['company_id'].unique().tolist(),
+        ).values_list('id', *PATCH_KEY),
+        columns=['id', *PATCH_KEY]
+    ).astype('int64')
+    replaced = existing.merge(keys, on=PATCH_KEY)['id'].tolist()
+    for start in range(0, len(replaced), LOOKUP_BATCH_SIZE):
+        CompanyEmissions.objects.filter(pk__in=replaced[start:start + LOOKUP_BATCH_SIZE]).delete()
+    write_rows(cleaned, uploaded_file, mode)
+
+    patch_stats(uploaded_file, before, _pair_frames(uploaded_file.id, pairs))
+    uploaded_file.aliases.all().delete()
+    UploadedFile.objects.filter(pk=uploaded_file.pk).update(
+        sha256='', content_hash='', storage=UploadedFile.DATABASE
+    )
+    if uploaded_file.storage == UploadedFile.BOTH:
+        transaction.on_commit(lambda: delete_archive(uploaded_file.pk))
+
+    result.update(
+        created=len(cleaned),
+        replaced=len(replaced),
+        years=sorted(pairs['year'].unique().tolist()),
+    )
+    return result
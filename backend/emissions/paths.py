@@ -0,0 +1,15 @@
+import os
+from django.conf import settings
+
+
+# Sem pyarrow: apagar o arquivo de um ficheiro não carrega a stack de análise (ver archive.py)
+def archive_path(file_id):
+    archive_dir = getattr(settings, 'EMISSIONS_ARCHIVE_DIR', settings.BASE_DIR / 'archive')
+    return os.path.join(archive_dir, f"{file_id}.parquet")
+
+
+def delete_archive(file_id):
+    try:
+        os.remove(archive_path(file_id))
+    except FileNotFoundError:
+        pass
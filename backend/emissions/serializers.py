@@ -1,8 +1,20 @@
 from rest_framework import serializers
-from .models import CompanyEmissions, UploadedFile
+from .models import CompanyEmissions, ImportJob
 
 class CompanyEmissionsSerializer(serializers.ModelSerializer):
+    company = serializers.CharField(source='company.name', read_only=True)
+    sector = serializers.CharField(source='sector.name', read_only=True)
+
     class Meta:
         model = CompanyEmissions
         fields = '__all__'
-        
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    file_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'name', 'status', 'rows_processed', 'rows_rejected',
+            'rejected_by_column', 'file_id', 'error', 'created_at', 'updated_at',
+        ]
@@ -0,0 +1,219 @@
+import json
+import numpy as np
+from .analytics import METRICS
+from .models import QuantileSketch
+
+
+# Compressão do t-digest: até ~100 centróides, erro de rank de ~0.1% nos percentis dos tiers
+COMPRESSION = 200
+
+
+class TDigest:
+    """
+    Mergeable t-digest (Dunning & Ertl) for approximate quantiles.
+
+    Values are summarized as weighted centroids, sorted by mean, whose
+    size is bounded by the `k1` scale function: centroids are small near
+    the tails and larger around the median, so there are at most about
+    `compression / 2` of them and quantiles have a bounded rank error
+    whatever the number of values. Two digests are merged by pooling
+    their centroids and compressing again, so the digest of several files
+    or years costs O(centroids), not O(values).
+
+    While every centroid holds a single value (inputs of up to about
+    `compression / 3` values) `quantile` is exactly `np.percentile` with
+    linear interpolation.
+    """
+
+    def __init__(self, compression=COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        """Add an array of values to the digest."""
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+        return self
+
+    def merge(self, other):
+        """Add the values summarized by another digest to this one."""
+        if other.count:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _k(self, q):
+        # função de escala k1: δ/2π · asin(2q - 1)
+        return self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        before = np.cumsum(weights) - weights
+        # centróides cuja fronteira esquerda cai no mesmo intervalo unitário de k são juntos
+        groups = np.floor(self._k(before / total) - self._k(0)).astype('int64')
+        _, groups = np.unique(groups, return_inverse=True)
+        self.weights = np.bincount(groups, weights=weights)
+        self.means = np.bincount(groups, weights=means * weights) / self.weights
+
+    def quantile(self, q):
+        """
+        Estimate the `q` quantile(s), with `q` in [0, 1].
+
+        Centroids are placed at the (0-based) rank of their centre, and
+        the estimate is interpolated linearly between them, like
+        `np.percentile` between sorted values.
+        """
+        if not self.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        before = np.cumsum(self.weights) - self.weights
+        ranks = np.concatenate([[0], before + (self.weights - 1) / 2, [self.count - 1]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(q) * (self.count - 1), ranks, values)
+
+    def percentile(self, p):
+        """`quantile` with `p` in [0, 100], like `np.percentile`."""
+        return self.quantile(np.asarray(p) / 100)
+
+    def to_dict(self):
+        return {
+            'compression': self.compression,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+            'min': self.min,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(data['compression'])
+        digest.means = np.array(data['means'], dtype='float64')
+        digest.weights = np.array(data['weights'], dtype='float64')
+        digest.min = data['min']
+        digest.max = data['max']
+        return digest
+
+
+def build_sketches(totals, compression=COMPRESSION):
+    """
+    Build one t-digest per year and metric from per-company totals.
+
+    Args:
+        totals (pd.DataFrame): One row per (year, company) with
+            `emissions` and `consumption`, as from `stats.company_frames`.
+
+    Returns:
+        dict: `{year: {metric: TDigest}}`, with the metric keys of
+            `analytics.METRICS` (`"co2"` and `"energy"`).
+    """
+    return {
+        year: {
+            prefix: TDigest(compression).update(group[column].to_numpy())
+            for prefix, column in METRICS.items()
+        }
+        for year, group in totals.groupby('year', sort=True)
+    }
+
+
+def store_sketches(uploaded_file, totals):
+    """
+    Replace the stored sketches of the years in `totals` for a file.
+
+    Called with the per-company totals when the stats of a file are
+    computed, and with the affected years' totals after a patch.
+    """
+    sketches = build_sketches(totals)
+    QuantileSketch.objects.filter(file=uploaded_file, year__in=[int(year) for year in sketches]).delete()
+    QuantileSketch.objects.bulk_create([
+        QuantileSketch(file=uploaded_file, year=int(year), payload=dump_sketches(digests))
+        for year, digests in sketches.items()
+    ])
+
+
+def dump_sketches(digests):
+    return json.dumps({prefix: digest.to_dict() for prefix, digest in digests.items()})
+
+
+def load_sketches(payload):
+    return {prefix: TDigest.from_dict(data) for prefix, data in json.loads(payload).items()}
+
+
+def merge_sketches(payloads, compression=COMPRESSION):
+    """Merge stored sketch payloads into one `{metric: TDigest}`."""
+    merged = {prefix: TDigest(compression) for prefix in METRICS}
+    for payload in payloads:
+        for prefix, digest in load_sketches(payload).items():
+            merged[prefix].merge(digest)
+    return merged
+
+
+def sketch_thresholds(digests):
+    """
+    Tier thresholds from merged digests, as `assign_tiers` would compute
+    them: the 75th (high) and 50th (medium) percentiles of each metric.
+    Empty digests (no companies matched) give None thresholds.
+    """
+    thresholds = {}
+    for prefix, digest in digests.items():
+        if not digest.count:
+            # NaN não é JSON válido
+            thresholds[prefix] = {'high': None, 'medium': None}
+            continue
+        high, medium = digest.percentile([75, 50])
+        thresholds[prefix] = {'high': float(high), 'medium': float(medium)}
+    return thresholds
+
+
+def combined_thresholds(file_ids, years=None):
+    """
+    Approximate tier thresholds of several files, per year and overall.
+
+    The stored sketches of the selected files and years are merged, so
+    the cost depends on the number of sketches, not on the number of
+    companies. A company present in several files counts once per file.
+
+    Returns:
+        dict: `years` (one entry per year with `year`, `companies` and
+            `thresholds`), plus `companies` and `thresholds` over all of
+            them. When no sketch matches (files without rows, or years
+            outside the files) `years` is empty and the thresholds are
+            None.
+    """
+    sketches = QuantileSketch.objects.filter(file_id__in=file_ids)
+    if years is not None:
+        sketches = sketches.filter(year__in=years)
+
+    by_year = {}
+    for year, payload in sketches.order_by('year', 'file_id').values_list('year', 'payload'):
+        by_year.setdefault(year, []).append(payload)
+
+    total = {prefix: TDigest() for prefix in METRICS}
+    result = []
+    for year, payloads in by_year.items():
+        digests = merge_sketches(payloads)
+        for prefix, digest in digests.items():
+            total[prefix].merge(digest)
+        result.append({
+            'year': str(year),
+            'companies': int(digests['co2'].count),
+            'thresholds': sketch_thresholds(digests),
+        })
+    return {
+        'years': result,
+        'companies': int(total['co2'].count),
+        'thresholds': sketch_thresholds(total),
+    }
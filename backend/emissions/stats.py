@@ -0,0 +1,658 @@
+import json
+import re
+from bisect import insort
+import msgpack
+import numpy as np
+import pandas as pd
+from django.db.models import F, Min, Sum
+from django.db.models.functions import NullIf
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from .analytics import (
+    assign_tiers, file_deltas, primary_sectors, sector_totals, tier_totals, year_trends
+)
+from .archive import archive_frames, iter_archive, read_archive
+from .instrumentation import span
+from .models import CompanyEmissions, FileStats, UploadedFile
+from .sketches import store_sketches
+
+
+def natural_sort_key(s):
+    """
+    Natural sorting key function.
+
+    This function returns a list of strings and integers obtained by
+    splitting the input string `s` at each sequence of digits. The
+    strings are converted to lower case and the integers are converted
+    to integers. This allows strings to be sorted in a natural way (i.e.,
+    "file2.txt" comes after "file10.txt").
+
+    Args:
+        s (str): The string to be sorted.
+
+    Returns:
+        list: A list of strings and integers representing the natural
+            sorting key of `s`.
+    """
+    return [int(text) if text.isdigit() else text.lower()
+            for text in re.split('([0-9]+)', s)]
+
+
+def company_frames(file_id, years=None, company_ids=None):
+    """
+    Aggregate a file's rows per (year, company) inside the database.
+
+    The sums are computed with `GROUP BY year, company_id` (covered by the
+    `(file, year, company)` index), so only one row per company and year
+    reaches Python. Sector membership comes from a second
+    grouped query, ordered by first appearance in the file, with the
+    company's emissions in each sector (see `primary_sectors`).
+
+    Args:
+        file_id (int): The ID of the `UploadedFile`.
+        years (list): Optional filter on the years.
+        company_ids (list): Optional filter on the companies.
+
+    Returns:
+        tuple: A `(totals, memberships)` pair of DataFrames. `totals` has
+            `year` (as a string), `name`, `emissions` and `consumption`;
+            `memberships` has `year`, `name`, `sector` and
+            `sector_emissions`.
+    """
+    queryset = CompanyEmissions.objects.filter(file_id=file_id).order_by()
+    if years is not None:
+        queryset = queryset.filter(year__in=years)
+    if company_ids is not None:
+        queryset = queryset.filter(company_id__in=company_ids)
+
+    totals = pd.DataFrame.from_records(
+        queryset.values('year', 'company_id').annotate(
+            name=F('company__name'),
+            emissions=Sum('co2_emissions'),
+            consumption=Sum('energy_consumption'),
+        ),
+        columns=['year', 'name', 'emissions', 'consumption']
+    )
+    memberships = pd.DataFrame.from_records(
+        queryset.values('year', 'company_id', 'sector_id').annotate(
+            name=F('company__name'),
+            sector=F('sector__name'),
+            sector_emissions=Sum('co2_emissions'),
+            first_id=Min('id'),
+        ).order_by('first_id'),
+        columns=['year', 'name', 'sector', 'sector_emissions']
+    )
+    totals['year'] = totals['year'].astype(str)
+    memberships['year'] = memberships['year'].astype(str)
+    return totals, memberships
+
+
+# Métricas do top-N -> expressão de ordenação
+RANKING_METRICS = {
+    'emissions': 'emissions',
+    'energy': 'consumption',
+    'intensity': 'intensity',
+}
+
+
+def top_companies(file_id, metric='emissions', limit=5, year=None, sector=None):
+    """
+    Return the top `limit` companies of a file by emissions, energy or intensity.
+
+    Rows are summed per (year, company) and ranked by the database with
+    `ORDER BY ... LIMIT`, so only `limit` rows reach Python. Intensity is
+    tCO2 per MWh; companies with no energy consumption are ranked last.
+    A company listed under several sectors is labelled with the sector
+    holding most of its emissions that year.
+
+    Args:
+        file_id (int): The ID of the `UploadedFile`.
+        metric (str): One of `RANKING_METRICS`.
+        limit (int): The number of companies to return.
+        year (int): Optional year filter.
+        sector (str): Optional sector filter (only that sector's rows count).
+
+    Returns:
+        list: Dictionaries with `rank`, `year`, `name`, `sector`,
+            `emissions`, `consumption` and `intensity`.
+    """
+    queryset = CompanyEmissions.objects.filter(file_id=file_id).order_by()
+    if year is not None:
+        queryset = queryset.filter(year=year)
+    if sector is not None:
+        queryset = queryset.filter(sector__name=sector)
+
+    ranking = list(queryset.values('year', 'company_id').annotate(
+        name=F('company__name'),
+        emissions=Sum('co2_emissions'),
+        consumption=Sum('energy_consumption'),
+    ).annotate(
+        intensity=F('emissions') / NullIf(F('consumption'), 0.0),
+    ).order_by(F(RANKING_METRICS[metric]).desc(nulls_last=True), 'year', 'name')[:limit])
+
+    # cada empresa fica com o setor onde tem mais emissões nesse ano (empate: ordem alfabética)
+    sectors = {}
+    if ranking:
+        memberships = queryset.filter(
+            year__in={entry['year'] for entry in ranking},
+            company_id__in={entry['company_id'] for entry in ranking},
+        ).values('year', 'company_id', 'sector__name').annotate(
+            total=Sum('co2_emissions'),
+        ).order_by(F('total').desc(nulls_last=True), 'sector__name')
+        for membership in memberships:
+            sectors.setdefault((membership['year'], membership['company_id']), membership['sector__name'])
+
+    return [{
+        'rank': rank,
+        'year': str(entry['year']),
+        'name': entry['name'],
+        'sector': sectors[entry['year'], entry['company_id']],
+        'emissions': entry['emissions'],
+        'consumption': entry['consumption'],
+        'intensity': entry['intensity'],
+    } for rank, entry in enumerate(ranking, start=1)]
+
+
+COMPARISON_GROUPS = {
+    'company': ('company_id', 'company__name'),
+    'sector': ('sector_id', 'sector__name'),
+}
+
+
+def compare_files(uploaded_files, group_by='sector', name=None):
+    """
+    Compare emissions and energy across several files.
+
+    All files are aggregated with a single `GROUP BY file_id, year,
+    <entity>` query; deltas, YoY growth and CAGR are then computed with
+    vectorized pandas/NumPy operations on the reduced data.
+
+    Args:
+        uploaded_files (list): `UploadedFile`s in chronological order.
+        group_by (str): `"company"` or `"sector"`.
+        name (str): Optional prefix filter on the company/sector name.
+
+    Returns:
+        list: One dictionary per entity with `name`, `by_file`, `deltas`,
+            `by_year`, `emissions_cagr` and `consumption_cagr`.
+    """
+    key, name_field = COMPARISON_GROUPS[group_by]
+    file_ids = [f.id for f in uploaded_files]
+    queryset = CompanyEmissions.objects.filter(file_id__in=file_ids).order_by()
+    if name:
+        queryset = queryset.filter(**{f'{name_field}__startswith': name})
+
+    frame = pd.DataFrame.from_records(
+        queryset.values('file_id', 'year', key).annotate(
+            name=F(name_field),
+            emissions=Sum('co2_emissions'),
+            consumption=Sum('energy_consumption'),
+        ),
+        columns=['file_id', 'year', 'name', 'emissions', 'consumption']
+    )
+    deltas = file_deltas(frame, file_ids)
+    trends = year_trends(frame, file_ids)
+    # entidades que só existem em anos substituídos por um ficheiro mais recente não têm série anual
+    no_trend = {'by_year': [], 'emissions_cagr': None, 'consumption_cagr': None}
+    return [{
+        'name': entity,
+        **deltas[entity],
+        **trends.get(entity, no_trend),
+    } for entity in sorted(deltas, key=natural_sort_key)]
+
+
+def file_info(uploaded_file):
+    return {
+        'id': uploaded_file.id,
+        'name': uploaded_file.name,
+        'upload_date': uploaded_file.upload_date
+    }
+
+
+def file_frames(uploaded_file):
+    """
+    `company_frames` of a file, read from its Parquet archive if it has one.
+    """
+    with span('fetch'):
+        if uploaded_file.storage != UploadedFile.DATABASE:
+            return archive_frames(uploaded_file.id)
+        return company_frames(uploaded_file.id)
+
+
+def compute_stats(file_id, frames=None):
+    """
+    Compute the tiers, sectors, companies and metadata of a file.
+
+    This is everything in the `FileStatsView` payload except `file_info`,
+    which is the only part that is not derived from the file's rows.
+
+    Args:
+        file_id (int): The ID of the `UploadedFile`.
+        frames (tuple): Optional `(totals, memberships)` to use instead of
+            querying `CompanyEmissions` (see `file_frames`).
+    """
+    if frames is None:
+        with span('fetch'):
+            frames = company_frames(file_id)
+    totals, memberships = frames
+
+    # Tiers and sectors are computed on the reduced (one row per company) data
+    with span('tier'):
+        frame = assign_tiers(totals)
+        tier_data = tier_totals(frame)
+
+    with span('aggregate'):
+        sector_data = sector_totals(frame, memberships)
+        frame['sector'] = primary_sectors(memberships).reindex(
+            pd.MultiIndex.from_frame(frame[['year', 'name']])
+        ).fillna('Unknown').to_numpy()
+
+        # Prepare sorted response data
+        sorted_years = sorted(tier_data.keys())
+        sector_list = sorted({s for year in sector_data.values() for s in year.keys()})
+        company_list = sorted(set(frame['name'].tolist()), key=natural_sort_key)
+
+        companies = {}
+        frame = frame.sort_values(['year', 'name'])
+        for year, group in frame.groupby('year', sort=False):
+            companies[year] = [{
+                'name': name,
+                'emissions': emissions,
+                'consumption': consumption,
+                'sector': sector
+            } for name, emissions, consumption, sector in zip(
+                group['name'].tolist(),
+                group['emissions'].tolist(),
+                group['consumption'].tolist(),
+                group['sector'].tolist(),
+            )]
+
+    return {
+        'tiers': [{
+            'year': year,
+            **tier_data[year]
+        } for year in sorted_years],
+        'sectors': [{
+            'year': year,
+            **{s: sector_data.get(year, {}).get(s, 0) for s in sector_list}
+        } for year in sorted_years],
+        'companies': [{
+            'year': year,
+            'companies': companies[year]
+        } for year in sorted_years],
+        'metadata': {
+            'years': sorted_years,
+            'sectors': sector_list,
+            'company_count': len(company_list),
+            'company_list': company_list
+        }
+    }
+
+
+def materialize_stats(uploaded_file):
+    """
+    Compute and store the stats of `uploaded_file` in `FileStats`.
+
+    Called inside the upload transaction and by the `backfill_stats`
+    management command. Files with a Parquet archive are aggregated from
+    the archive. The quantile sketches of every year are stored too (see
+    `sketches.store_sketches`).
+
+    Returns:
+        FileStats: The stored row.
+    """
+    frames = file_frames(uploaded_file)
+    file_stats, _ = FileStats.objects.update_or_create(
+        file=uploaded_file,
+        defaults={'payload': json.dumps(compute_stats(uploaded_file.id, frames))}
+    )
+    store_sketches(uploaded_file, frames[0])
+    return file_stats
+
+
+def backfill_sketches(uploaded_file):
+    """
+    Store the quantile sketches of a file uploaded before they existed.
+
+    Only the sketches are computed, not the rest of the stats. Called by
+    `TierThresholdsView` for files without sketches; `backfill_stats`
+    stores them together with the stats.
+    """
+    store_sketches(uploaded_file, file_frames(uploaded_file)[0])
+
+
+def patch_stats(uploaded_file, before, after):
+    """
+    Update the stored stats of a file after some of its rows were replaced.
+
+    `before` and `after` are the `company_frames` of the affected (year,
+    company) pairs, taken before and after the rows were written. Company
+    totals are replaced, sector totals are adjusted by the difference and
+    tiers (and quantile sketches) are recomputed only for the affected
+    years, from the company totals already stored in the payload, so no
+    other row of the file is read from the database.
+
+    Returns:
+        FileStats: The updated row. Files without stored stats are
+            computed from scratch.
+    """
+    try:
+        file_stats = FileStats.objects.select_for_update().get(pk=uploaded_file.pk)
+    except FileStats.DoesNotExist:
+        return materialize_stats(uploaded_file)
+
+    payload = json.loads(file_stats.payload)
+    tiers = {entry['year']: entry for entry in payload['tiers']}
+    sectors = {entry.pop('year'): entry for entry in payload['sectors']}
+    companies = {
+        entry['year']: {company['name']: company for company in entry['companies']}
+        for entry in payload['companies']
+    }
+    company_list = payload['metadata']['company_list']
+    known = set(company_list)
+
+    # Setores: retira a contribuição antiga das empresas afetadas e soma a nova
+    for (totals, memberships), sign in ((before, -1), (after, 1)):
+        merged = memberships.merge(totals, on=['year', 'name'])
+        for year, sector, emissions, consumption in zip(
+            merged['year'].tolist(), merged['sector'].tolist(),
+            merged['emissions'].tolist(), merged['consumption'].tolist()
+        ):
+            year_sectors = sectors.setdefault(year, {})
+            year_sectors[sector] = year_sectors.get(sector, 0) + sign * emissions
+            energy_key = f"{sector}_energy"
+            year_sectors[energy_key] = year_sectors.get(energy_key, 0) + sign * consumption
+
+    totals, memberships = after
+    sector_of = primary_sectors(memberships)
+    resort = set()
+    for year, name, emissions, consumption in zip(
+        totals['year'].tolist(), totals['name'].tolist(),
+        totals['emissions'].tolist(), totals['consumption'].tolist()
+    ):
+        year_companies = companies.setdefault(year, {})
+        if name not in year_companies:
+            resort.add(year)
+        year_companies[name] = {
+            'name': name,
+            'emissions': emissions,
+            'consumption': consumption,
+            'sector': sector_of.get((year, name), 'Unknown'),
+        }
+        if name not in known:
+            known.add(name)
+            insort(company_list, name, key=natural_sort_key)
+
+    frames = []
+    for year in set(totals['year'].tolist()):
+        if year in resort:
+            companies[year] = dict(sorted(companies[year].items()))
+        frame = pd.DataFrame(
+            list(companies[year].values()), columns=['name', 'emissions', 'consumption']
+        ).assign(year=year)
+        tiers[year] = {'year': year, **tier_totals(assign_tiers(frame))[year]}
+        frames.append(frame)
+    if frames:
+        store_sketches(uploaded_file, pd.concat(frames, ignore_index=True))
+
+    sorted_years = sorted(tiers)
+    sector_list = sorted({s for year in sectors.values() for s in year})
+    file_stats.payload = json.dumps({
+        'tiers': [tiers[year] for year in sorted_years],
+        'sectors': [{
+            'year': year,
+            **{s: sectors.get(year, {}).get(s, 0) for s in sector_list}
+        } for year in sorted_years],
+        'companies': [{
+            'year': year,
+            'companies': list(companies[year].values())
+        } for year in sorted_years],
+        'metadata': {
+            'years': sorted_years,
+            'sectors': sector_list,
+            'company_count': len(company_list),
+            'company_list': company_list
+        }
+    })
+    file_stats.save()
+    return file_stats
+
+
+# Linhas do arquivo Parquet lidas de cada vez no modo streaming
+STREAM_CHUNK_SIZE = 10_000
+
+
+def _archive_year_frames(file_id, year, chunk_size):
+    # soma por empresa lote a lote: a memória depende do número de empresas, não de linhas
+    totals = None
+    memberships = None
+    for rows in iter_archive(
+        file_id, ['name', 'sector', 'co2_emissions', 'energy_consumption'], year=year, batch_size=chunk_size
+    ):
+        part = rows.groupby('name', sort=False)[['co2_emissions', 'energy_consumption']].sum()
+        totals = part if totals is None else pd.concat([totals, part]).groupby(level=0, sort=False).sum()
+        # emissões por setor, pela ordem da primeira ocorrência
+        pairs = rows.groupby(['name', 'sector'], sort=False)['co2_emissions'].sum()
+        memberships = pairs if memberships is None else (
+            pd.concat([memberships, pairs]).groupby(level=[0, 1], sort=False).sum()
+        )
+
+    if totals is None:
+        totals = pd.DataFrame(columns=['co2_emissions', 'energy_consumption'], index=pd.Index([], name='name'))
+        memberships = pd.Series(
+            [], dtype='float64', name='co2_emissions',
+            index=pd.MultiIndex.from_arrays([[], []], names=['name', 'sector']),
+        )
+    totals = totals.reset_index().rename(columns={
+        'co2_emissions': 'emissions',
+        'energy_consumption': 'consumption',
+    })
+    totals.insert(0, 'year', str(year))
+    memberships = memberships.rename('sector_emissions').reset_index()
+    memberships.insert(0, 'year', str(year))
+    return totals[['year', 'name', 'emissions', 'consumption']], memberships
+
+
+def _year_frames(uploaded_file, year, chunk_size):
+    # `company_frames` de um só ano
+    if uploaded_file.storage != UploadedFile.DATABASE:
+        return _archive_year_frames(uploaded_file.id, year, chunk_size)
+    return company_frames(uploaded_file.id, years=[year])
+
+
+def _file_years(uploaded_file):
+    if uploaded_file.storage != UploadedFile.DATABASE:
+        return sorted(set(read_archive(uploaded_file.id, columns=['year'])['year'].tolist()))
+    return list(
+        CompanyEmissions.objects.filter(file=uploaded_file).order_by('year')
+        .values_list('year', flat=True).distinct()
+    )
+
+
+def stream_stats(uploaded_file, summary=False, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Generate the `FileStatsView` payload as newline-delimited JSON.
+
+    Instead of building the whole payload, each year is aggregated on
+    its own (with a `GROUP BY` in the database, or from the Parquet
+    archive `chunk_size` rows at a time) and sent as soon as its stats
+    are computed, so memory is bounded by the number of companies in the
+    largest year rather than by the rows of the file.
+    The lines are, in order:
+
+    * `{"type": "file_info", ...}`
+    * one `{"type": "year", "year", "tiers", "sectors", "companies"}` per
+      year, with the same values as the matching entries of the full
+      payload. `sectors` only has the sectors present in that year.
+    * `{"type": "metadata", ...}`, the full payload's `metadata`.
+
+    With `summary` set, `companies` and `metadata.company_list` are left
+    out, as in the full payload.
+
+    Yields:
+        bytes: One JSON document per line, newline-terminated.
+    """
+    renderer = JSONRenderer()
+    yield renderer.render({'type': 'file_info', **file_info(uploaded_file)}) + b"\n"
+
+    years = []
+    sectors = set()
+    names = set()
+    for year in _file_years(uploaded_file):
+        totals, memberships = _year_frames(uploaded_file, year, chunk_size)
+        year = str(year)
+        frame = assign_tiers(totals)
+        sector_data = sector_totals(frame, memberships).get(year, {})
+        section = {
+            'type': 'year',
+            'year': year,
+            'tiers': tier_totals(frame)[year],
+            'sectors': sector_data,
+        }
+        if not summary:
+            frame['sector'] = primary_sectors(memberships).reindex(
+                pd.MultiIndex.from_frame(frame[['year', 'name']])
+            ).fillna('Unknown').to_numpy()
+            frame = frame.sort_values('name')
+            section['companies'] = [{
+                'name': name,
+                'emissions': emissions,
+                'consumption': consumption,
+                'sector': sector
+            } for name, emissions, consumption, sector in zip(
+                frame['name'].tolist(),
+                frame['emissions'].tolist(),
+                frame['consumption'].tolist(),
+                frame['sector'].tolist(),
+            )]
+        years.append(year)
+        sectors.update(sector_data)
+        names.update(frame['name'].tolist())
+        yield renderer.render(section) + b"\n"
+
+    metadata = {
+        'type': 'metadata',
+        'years': years,
+        'sectors': sorted(sectors),
+        'company_count': len(names),
+    }
+    if not summary:
+        metadata['company_list'] = sorted(names, key=natural_sort_key)
+    yield renderer.render(metadata) + b"\n"
+
+
+def load_file_stats(file_id):
+    """
+    Return the stored `FileStatsView` payload for `file_id`, or None.
+
+    The stats row and its file are fetched with a single primary-key
+    lookup.
+    """
+    try:
+        file_stats = FileStats.objects.select_related('file').get(pk=file_id)
+    except FileStats.DoesNotExist:
+        return None
+    return stats_payload(file_stats)
+
+
+def stats_payload(file_stats):
+    """Build the `FileStatsView` payload from a `FileStats` row (no queries)."""
+    return {
+        'file_info': file_info(file_stats.file),
+        **json.loads(file_stats.payload)
+    }
+
+
+# Tipos dos arrays do formato colunar (little-endian)
+FLOAT_DTYPE = '<f8'
+INDEX_DTYPE = '<u4'
+
+
+def columnar_stats(payload, summary=False):
+    """
+    Re-encode a `FileStatsView` payload as dictionary-encoded columns.
+
+    Company and sector names are listed once and referred to by position,
+    and numbers are packed into little-endian typed arrays (`float64`
+    values, `uint32` indices) stored as raw bytes, ready for
+    `msgpack.packb`. The layout is:
+
+    * `years`, `sectors`, `companies`: the name dictionaries.
+    * `tiers`: `{"co2_high": float64[year], ...}`.
+    * `sector_emissions`, `sector_consumption`: `float64[year, sector]`,
+      row-major.
+    * `rows`: one entry per (year, company) in the `year`, `company` and
+      `sector` index columns and the `emissions` and `consumption` value
+      columns. Left out when `summary` is set, like `companies`.
+
+    Args:
+        payload (dict): The full payload, as returned by `stats_payload`.
+        summary (bool): Leave out the per-company rows.
+
+    Returns:
+        dict: The columnar payload.
+    """
+    years = payload['metadata']['years']
+    company_list = payload['metadata']['company_list']
+    keys = set(payload['metadata']['sectors'])
+    frames = [
+        pd.DataFrame(entry['companies'], columns=['name', 'emissions', 'consumption', 'sector']).assign(year=i)
+        for i, entry in enumerate(payload['companies'])
+    ]
+    rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=['name', 'emissions', 'consumption', 'sector', 'year']
+    )
+    # os setores são as chaves com uma chave "_energy" correspondente, mais o setor de cada empresa
+    sectors = sorted({key for key in keys if f"{key}_energy" in keys} | set(rows['sector'].tolist()))
+
+    sector_rows = {entry['year']: entry for entry in payload['sectors']}
+    columnar = {
+        'format': 'columnar-v1',
+        'file_info': json.loads(json.dumps(payload['file_info'], cls=JSONEncoder)),
+        'years': years,
+        'sectors': sectors,
+        'tiers': {
+            key: np.array([entry[key] for entry in payload['tiers']], dtype=FLOAT_DTYPE).tobytes()
+            for key in (payload['tiers'][0] if payload['tiers'] else {}) if key != 'year'
+        },
+        'sector_emissions': np.array(
+            [[sector_rows[year].get(s, 0) for s in sectors] for year in years], dtype=FLOAT_DTYPE
+        ).tobytes(),
+        'sector_consumption': np.array(
+            [[sector_rows[year].get(f"{s}_energy", 0) for s in sectors] for year in years], dtype=FLOAT_DTYPE
+        ).tobytes(),
+        'company_count': payload['metadata']['company_count'],
+    }
+    if not summary:
+        columnar['companies'] = company_list
+        columnar['rows'] = {
+            'year': rows['year'].to_numpy(dtype=INDEX_DTYPE).tobytes(),
+            'company': pd.Categorical(rows['name'], categories=company_list).codes.astype(INDEX_DTYPE).tobytes(),
+            'sector': pd.Categorical(rows['sector'], categories=sectors).codes.astype(INDEX_DTYPE).tobytes(),
+            'emissions': rows['emissions'].to_numpy(dtype=FLOAT_DTYPE).tobytes(),
+            'consumption': rows['consumption'].to_numpy(dtype=FLOAT_DTYPE).tobytes(),
+        }
+    return columnar
+
+
+def render_stats(file_stats, summary=False, fmt='json'):
+    """
+    Render the `FileStatsView` response body of a `FileStats` row.
+
+    Args:
+        file_stats (FileStats): The stored stats, with `file` loaded.
+        summary (bool): Leave out the per-company breakdown.
+        fmt (str): `"json"` (the original payload, rendered like DRF) or
+            `"msgpack"` (the `columnar_stats` layout).
+
+    Returns:
+        bytes: The response body.
+    """
+    with span('serialize'):
+        response_data = stats_payload(file_stats)
+        if fmt == 'msgpack':
+            return msgpack.packb(columnar_stats(response_data, summary))
+        if summary:
+            del response_data['companies']
+            del response_data['metadata']['company_list']
+        return JSONRenderer().render(response_data)
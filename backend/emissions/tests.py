@@ -1,3 +1,1097 @@
-from django.test import TestCase
+from collections import defaultdict
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import warnings
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from msgpack import unpackb
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .analytics import assign_tiers, primary_sectors, tier_totals
+from .benchmarks import find_regressions, synthetic_dataframe
+from .cache import HISTORY_KEY, HISTORY_SCOPE, cached_response, invalidate_history, json_response
+from .dedup import ContentDigest, lock_content
+from .archive import parquet_supported, read_archive
+from .ingestion import clean_dataframe, open_table
+from .loaders import attach_dimension_ids, copy_rows, load_rows
+from .middleware import InstrumentationMiddleware
+from .sketches import TDigest
+from .jobs import get_storage, purge_file, recover_stale_jobs
+from .models import (
+    Company, CompanyEmissions, FileStats, ImportJob, QuantileSketch, Sector, UploadAlias, UploadedFile
+)
+from .paths import archive_path
+from .stats import compute_stats, materialize_stats, natural_sort_key, stream_stats
+
+
+def make_workbook(rows, name="dgeg.xlsx"):
+    """Build an in-memory DGEG workbook from a list of row dicts."""
+    buffer = BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    return SimpleUploadedFile(
+        name,
+        buffer.getvalue(),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+def row(company, sector, energy, emissions, year):
+    return {
+        "Empresa": company,
+        "Setor": sector,
+        "Consumo de Energia (MWh)": energy,
+        "Emissões de CO2 (toneladas)": emissions,
+        "Ano": year,
+    }
+
+
+# Cache em memória: os testes não tocam na cache em ficheiro do servidor (BASE_DIR/.cache)
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'emissions-tests',
+    }
+}
+
+
+def emission(uploaded_file, company, sector, energy, emissions, year):
+    """Build an unsaved CompanyEmissions row, creating its company/sector."""
+    return CompanyEmissions(
+        file=uploaded_file,
+        company=Company.objects.get_or_create(name=company)[0],
+        sector=Sector.objects.get_or_create(name=sector)[0],
+        energy_consumption=energy,
+        co2_emissions=emissions,
+        year=year,
+    )
+
+
+class CleanDataFrameTests(TestCase):
+    def test_rejects_invalid_rows_per_column(self):
+        df = pd.DataFrame([
+            row("A", "Industria", 10.0, 1.0, 2020),
+            row("B", "Industria", np.nan, 2.0, 2020),
+            row("C", "Servicos", "n/a", 3.0, 2021),
+            row(None, "Servicos", 4.0, 4.0, 2021),
+            row("E", "Servicos", 5.0, 5.0, None),
+            row("F", "Servicos", 6.0, 6.0, 2021.5),
+        ])
+
+        cleaned, rejected = clean_dataframe(df)
+
+        self.assertEqual(cleaned['name'].tolist(), ["A"])
+        self.assertEqual(rejected["Consumo de Energia (MWh)"], 2)
+        self.assertEqual(rejected["Empresa"], 1)
+        self.assertEqual(rejected["Ano"], 2)
+        self.assertEqual(cleaned['year'].dtype, np.int64)
+
+
+class TierAnalyticsTests(TestCase):
+    def test_tiers_use_inclusive_percentile_thresholds(self):
+        frame = pd.DataFrame({
+            'year': ["2020"] * 4 + ["2021"] * 2,
+            'name': ["A", "B", "C", "D", "A", "B"],
+            'emissions': [1.0, 2.0, 3.0, 4.0, 5.0, 5.0],
+            'consumption': [4.0, 3.0, 2.0, 1.0, 1.0, 9.0],
+        })
+
+        tiers = assign_tiers(frame)
+        totals = tier_totals(tiers)
+
+        # percentis 2020: 75% = 3.25, 50% = 2.5
+        self.assertEqual(tiers['co2_tier'].tolist(), ["low", "low", "medium", "high", "high", "high"])
+        self.assertEqual(totals["2020"]['co2_high'], 4.0)
+        self.assertEqual(totals["2020"]['energy_high'], 4.0)
+        self.assertEqual(totals["2021"]['co2_high'], 10.0)
+        self.assertIs(totals["2021"]['co2_medium'], 0)
+
+    def test_primary_sector_is_largest_emitter_then_alphabetical(self):
+        memberships = pd.DataFrame({
+            'year': ["2020", "2020", "2020", "2020"],
+            'name': ["A", "A", "B", "B"],
+            'sector': ["Serviços", "Industria", "Transportes", "Agricultura"],
+            'sector_emissions': [1.0, 3.0, 2.0, 2.0],
+        })
+
+        sectors = primary_sectors(memberships)
+
+        self.assertEqual(sectors[("2020", "A")], "Industria")
+        self.assertEqual(sectors[("2020", "B")], "Agricultura")
+
+
+class OpenTableTests(TestCase):
+    def test_reads_xlsx_in_chunks(self):
+        upload = make_workbook([row(f"E{i}", "Industria", i, i, 2020) for i in range(5)])
+
+        columns, chunks = open_table(upload, chunk_size=2)
+
+        self.assertEqual(set(columns), {"Empresa", "Setor", "Consumo de Energia (MWh)",
+                                        "Emissões de CO2 (toneladas)", "Ano"})
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+
+    def test_reads_csv_in_chunks(self):
+        content = "Empresa,Setor,Consumo de Energia (MWh),Emissões de CO2 (toneladas),Ano\n"
+        content += "".join(f"E{i},Industria,{i},{i},2020\n" for i in range(3))
+        upload = SimpleUploadedFile("dgeg.csv", content.encode(), content_type="text/csv")
+
+        columns, chunks = open_table(upload, chunk_size=2)
+
+        self.assertIn("Ano", columns)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+
+    def test_rejects_invalid_file(self):
+        upload = SimpleUploadedFile("dgeg.xlsx", b"not a spreadsheet")
+
+        with self.assertRaises(ValueError):
+            open_table(upload)
+
+
+class CopyRowsTests(TestCase):
+    def test_renders_csv_from_columns(self):
+        cleaned, _ = clean_dataframe(pd.DataFrame([
+            row("A, Lda", "Industria", 10.5, 1.25, 2020),
+            row("", "Servicos", 3.0, 0.5, 2021),
+        ]))
+        cleaned = attach_dimension_ids(cleaned)
+        uploaded_file = UploadedFile.objects.create(name="copy.xlsx")
+        payloads = []
+        cursor = mock.MagicMock()
+        cursor.copy_expert.side_effect = lambda sql, buffer: payloads.append((sql, buffer.read()))
+
+        with mock.patch("emissions.loaders.connection") as connection:
+            connection.cursor.return_value.__enter__.return_value = cursor
+            connection.ops.quote_name = lambda name: f'"{name}"'
+            copy_rows(cleaned, uploaded_file, batch_size=1)
+
+        self.assertEqual(len(payloads), 2)
+        self.assertIn('COPY "emissions_companyemissions"', payloads[0][0])
+        company = Company.objects.get(name="A, Lda")
+        sector = Sector.objects.get(name="Industria")
+        self.assertEqual(payloads[0][1], f'{uploaded_file.pk},{company.pk},{sector.pk},10.5,1.25,2020\n')
+        self.assertTrue(Company.objects.filter(name="").exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FileUploadViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_upload_skips_rejected_rows(self):
+        upload = make_workbook([
+            row("A", "Industria", 10.0, 1.0, 2020),
+            row("B", "Industria", np.nan, 2.0, 2020),
+            row("C", "Servicos", 30.0, 3.0, 2021),
+        ])
+
+        response = self.client.post("/api/upload-file/", {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["records_created"], 2)
+        self.assertEqual(response.data["records_rejected"], 1)
+        self.assertEqual(response.data["rejected_by_column"]["Consumo de Energia (MWh)"], 1)
+        uploaded_file = UploadedFile.objects.get(pk=response.data["file_id"])
+        self.assertEqual(
+            sorted(CompanyEmissions.objects.filter(file=uploaded_file).values_list("company__name", flat=True)),
+            ["A", "C"],
+        )
+        self.assertTrue(FileStats.objects.filter(file=uploaded_file).exists())
+
+    def test_upload_missing_columns(self):
+        upload = make_workbook([{"Empresa": "A", "Setor": "Industria"}])
+
+        response = self.client.post("/api/upload-file/", {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_upload_returns_existing_file(self):
+        rows = [row("A", "Industria", 10.0, 1.0, 2020), row("B", "Servicos", 20.0, 2.0, 2021)]
+        first = self.client.post("/api/upload-file/", {"file": make_workbook(rows)}, format="multipart")
+
+        # mesmos bytes, e os mesmos dados como CSV com as linhas por outra ordem
+        copy = make_workbook(rows, "copia.xlsx")
+        same_bytes = self.client.post("/api/upload-file/", {"file": copy}, format="multipart")
+        csv_upload = SimpleUploadedFile("dgeg.csv", pd.DataFrame(rows[::-1]).to_csv(index=False).encode())
+        same_content = self.client.post("/api/upload-file/", {"file": csv_upload}, format="multipart")
+
+        self.assertFalse(first.data["duplicate"])
+        for response in (same_bytes, same_content):
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data["duplicate"])
+            self.assertEqual(response.data["file_id"], first.data["file_id"])
+        self.assertEqual(UploadedFile.objects.count(), 1)
+        self.assertEqual(CompanyEmissions.objects.count(), 2)
+        self.assertEqual(
+            list(UploadAlias.objects.order_by("pk").values_list("name", flat=True)), ["copia.xlsx", "dgeg.csv"]
+        )
+
+    def test_uploads_without_valid_rows_are_not_duplicates(self):
+        rejected = make_workbook([row("A", "Industria", np.nan, 1.0, 2020)])
+        header_only = SimpleUploadedFile("vazio.csv", ",".join(row("A", "I", 1, 1, 2020)).encode() + b"\n")
+
+        first = self.client.post("/api/upload-file/", {"file": rejected}, format="multipart")
+        second = self.client.post("/api/upload-file/", {"file": header_only}, format="multipart")
+
+        self.assertEqual(first.data["records_created"], 0)
+        self.assertFalse(second.data["duplicate"])
+        self.assertNotEqual(second.data["file_id"], first.data["file_id"])
+
+    def test_content_digest_covers_rows(self):
+        frame = clean_dataframe(pd.DataFrame([
+            row("A", "Industria", 10.0, 1.0, 2020),
+            row("B", "Servicos", 20.0, 2.0, 2021),
+            row("C", "Servicos", 30.0, 3.0, 2021),
+        ]))[0]
+
+        def digest(*chunks):
+            content = ContentDigest()
+            for chunk in chunks:
+                content.update(chunk)
+            return content.hexdigest()
+
+        self.assertEqual(digest(frame), digest(frame.iloc[2:], frame.iloc[:2]))
+        self.assertNotEqual(digest(frame), digest(frame.iloc[[0, 0, 2]]))
+        self.assertEqual(digest(frame.iloc[:0]), "")
+
+
+@skipUnless(parquet_supported(), "pyarrow is not installed")
+@override_settings(
+    CACHES=LOCMEM_CACHES, EMISSIONS_ROW_STORAGE="parquet", EMISSIONS_ARCHIVE_DIR=tempfile.mkdtemp()
+)
+class ParquetStorageTests(TestCase):
+    def test_stats_computed_from_archive(self):
+        rows = [
+            row("A", "Industria", 10.0, 1.5, 2020),
+            row("A", "Servicos", 2.5, 0.25, 2020),
+            row("B", "Industria", 7.0, 3.0, 2021),
+        ]
+
+        response = APIClient().post("/api/upload-file/", {"file": make_workbook(rows)}, format="multipart")
+
+        uploaded_file = UploadedFile.objects.get(pk=response.data["file_id"])
+        self.assertEqual(uploaded_file.storage, UploadedFile.PARQUET)
+        self.assertFalse(CompanyEmissions.objects.exists())
+        self.assertEqual(len(read_archive(uploaded_file.id)), 3)
+
+        # as mesmas linhas guardadas na base de dados dão os mesmos indicadores
+        reference = UploadedFile.objects.create(name="reference.xlsx")
+        cleaned, _ = clean_dataframe(pd.DataFrame(rows))
+        load_rows(cleaned, reference)
+        payload = FileStats.objects.get(file=uploaded_file).payload
+        self.assertEqual(json.loads(payload), compute_stats(reference.id))
+        streamed = [json.loads(line) for line in stream_stats(uploaded_file)]
+        self.assertEqual(streamed[1:], [json.loads(line) for line in stream_stats(reference)][1:])
+        # lido do arquivo uma linha de cada vez, somado lote a lote
+        self.assertEqual([json.loads(line) for line in stream_stats(uploaded_file, chunk_size=1)], streamed)
+
+        purge_file(uploaded_file.id)
+        self.assertFalse(os.path.exists(archive_path(uploaded_file.id)))
+
+    def test_failed_upload_removes_archive(self):
+        upload = make_workbook([row("A", "Industria", 10.0, 1.5, 2020)])
+
+        with mock.patch("emissions.stats.materialize_stats", side_effect=RuntimeError("boom")):
+            response = APIClient().post("/api/upload-file/", {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(UploadedFile.objects.exists())
+        self.assertEqual(os.listdir(settings.EMISSIONS_ARCHIVE_DIR), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ArchiveOnlyFileTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.archived = UploadedFile.objects.create(name="archived.xlsx", storage=UploadedFile.PARQUET)
+        self.other = UploadedFile.objects.create(name="other.xlsx")
+        emission(self.other, "A", "Industria", 1.0, 1.0, 2020).save()
+
+    def assert_rejected(self, url, params=None):
+        response = self.client.get(url, params)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("only stored in Parquet", response.data["error"])
+
+    def test_rows_rejected(self):
+        self.assert_rejected(f"/api/files/{self.archived.id}/emissions/")
+
+    def test_top_companies_rejected(self):
+        self.assert_rejected(f"/api/files/{self.archived.id}/top/")
+
+    def test_comparison_rejected(self):
+        self.assert_rejected("/api/compare/", {"files": f"{self.other.id},{self.archived.id}"})
+
+
+def legacy_file_stats(uploaded_file):
+    """The original row-by-row FileStatsView aggregation, kept as a reference."""
+    queryset = CompanyEmissions.objects.filter(file_id=uploaded_file.id)
+    tier_data = defaultdict(lambda: {
+        'co2_high': 0, 'co2_medium': 0, 'co2_low': 0,
+        'energy_high': 0, 'energy_medium': 0, 'energy_low': 0
+    })
+    sector_data = defaultdict(lambda: defaultdict(float))
+    company_data = defaultdict(lambda: defaultdict(lambda: {
+        'emissions': 0, 'consumption': 0, 'sectors': {}
+    }))
+
+    entries = queryset.values('year', 'co2_emissions', 'energy_consumption').annotate(
+        name=F('company__name'), sector=F('sector__name')
+    ).order_by('id')
+    for entry in entries:
+        year = str(entry['year'])
+        company = entry['name']
+        company_data[year][company]['emissions'] += entry['co2_emissions'] or 0
+        company_data[year][company]['consumption'] += entry['energy_consumption'] or 0
+        sectors = company_data[year][company]['sectors']
+        sectors[entry['sector']] = sectors.get(entry['sector'], 0) + (entry['co2_emissions'] or 0)
+
+    for year, companies in sorted(company_data.items(), key=lambda x: x[0]):
+        emissions_values = [c['emissions'] for c in companies.values()]
+        consumption_values = [c['consumption'] for c in companies.values()]
+        co2_high = np.percentile(emissions_values, 75)
+        co2_medium = np.percentile(emissions_values, 50)
+        energy_high = np.percentile(consumption_values, 75)
+        energy_medium = np.percentile(consumption_values, 50)
+
+        for company, data in sorted(companies.items(), key=lambda x: x[0]):
+            if data['emissions'] >= co2_high:
+                tier_data[year]['co2_high'] += data['emissions']
+            elif data['emissions'] >= co2_medium:
+                tier_data[year]['co2_medium'] += data['emissions']
+            else:
+                tier_data[year]['co2_low'] += data['emissions']
+            if data['consumption'] >= energy_high:
+                tier_data[year]['energy_high'] += data['consumption']
+            elif data['consumption'] >= energy_medium:
+                tier_data[year]['energy_medium'] += data['consumption']
+            else:
+                tier_data[year]['energy_low'] += data['consumption']
+            for sector in data['sectors']:
+                sector_data[year][sector] += data['emissions']
+                sector_data[year][f"{sector}_energy"] += data['consumption']
+
+    sorted_years = sorted(tier_data.keys())
+    sector_list = sorted({s for year in sector_data.values() for s in year.keys()})
+    company_list = sorted(
+        {c for year in company_data.values() for c in year.keys()},
+        key=natural_sort_key
+    )
+    return {
+        'file_info': {
+            'id': uploaded_file.id,
+            'name': uploaded_file.name,
+            'upload_date': uploaded_file.upload_date
+        },
+        'tiers': [{'year': year, **tier_data[year]} for year in sorted_years],
+        'sectors': [{
+            'year': year,
+            **{s: sector_data[year].get(s, 0) for s in sector_list}
+        } for year in sorted_years],
+        'companies': [{
+            'year': year,
+            'companies': sorted([{
+                'name': company,
+                'emissions': data['emissions'],
+                'consumption': data['consumption'],
+                # o original usava next(iter(set)), que depende da hash seed;
+                # aqui fica a regra determinística (mais emissões, depois nome)
+                'sector': min(data['sectors'], key=lambda s: (-data['sectors'][s], s))
+                if data['sectors'] else 'Unknown'
+            } for company, data in company_data[year].items()], key=lambda x: x['name'])
+        } for year in sorted_years],
+        'metadata': {
+            'years': sorted_years,
+            'sectors': sector_list,
+            'company_count': len(company_list),
+            'company_list': company_list
+        }
+    }
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FileStatsViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.uploaded_file = UploadedFile.objects.create(name="stats.xlsx")
+        rng = np.random.default_rng(42)
+        rows = []
+        for i in range(200):
+            # Valores reais (não diádicos), empresas em vários setores e linhas
+            # fora de ordem: qualquer mudança na ordem das somas muda os bits
+            rows.append(emission(
+                self.uploaded_file,
+                f"Empresa {rng.integers(0, 40)}",
+                f"Setor {rng.integers(0, 4)}",
+                float(rng.lognormal(6, 1.5)),
+                float(rng.lognormal(4, 1)),
+                int(rng.integers(2018, 2022)),
+            ))
+        rows.append(emission(self.uploaded_file, "Empresa 1", "Setor 9", 1.5, 0.25, 2019))
+        CompanyEmissions.objects.bulk_create(rows)
+
+    def test_response_is_byte_identical_to_legacy_aggregation(self):
+        response = self.client.get(f"/api/files/{self.uploaded_file.id}/stats/")
+
+        self.assertEqual(response.status_code, 200)
+        expected = JSONRenderer().render(legacy_file_stats(self.uploaded_file))
+        self.assertEqual(response.content, expected)
+
+    def test_backfill_stores_stats(self):
+        call_command("backfill_stats", stdout=StringIO())
+
+        file_stats = FileStats.objects.get(file=self.uploaded_file)
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/files/{self.uploaded_file.id}/stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["metadata"]["company_count"],
+            CompanyEmissions.objects.values("company").distinct().count(),
+        )
+        self.assertIn('"tiers"', file_stats.payload)
+
+    def test_missing_file(self):
+        response = self.client.get("/api/files/999/stats/")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_msgpack_columnar_stats(self):
+        url = f"/api/files/{self.uploaded_file.id}/stats/"
+        expected = self.client.get(url).json()
+
+        response = self.client.get(url, HTTP_ACCEPT="application/vnd.msgpack")
+
+        self.assertEqual(response["Content-Type"], "application/vnd.msgpack")
+        self.assertIn("Accept", response["Vary"])
+        data = unpackb(response.content)
+        self.assertEqual(data["years"], expected["metadata"]["years"])
+        self.assertEqual(data["companies"], expected["metadata"]["company_list"])
+        rows = data["rows"]
+        emissions = np.frombuffer(rows["emissions"], dtype="<f8")
+        company = np.frombuffer(rows["company"], dtype="<u4")
+        year = np.frombuffer(rows["year"], dtype="<u4")
+        decoded = [(data["years"][y], data["companies"][c], e) for y, c, e in zip(year, company, emissions)]
+        self.assertEqual(decoded, [
+            (entry["year"], c["name"], c["emissions"]) for entry in expected["companies"] for c in entry["companies"]
+        ])
+        sector_emissions = np.frombuffer(data["sector_emissions"], dtype="<f8").reshape(len(data["years"]), -1)
+        self.assertEqual(
+            sector_emissions[0, data["sectors"].index("Setor 0")], expected["sectors"][0]["Setor 0"]
+        )
+        self.assertEqual(
+            np.frombuffer(data["tiers"]["co2_high"], dtype="<f8").tolist(),
+            [t["co2_high"] for t in expected["tiers"]],
+        )
+
+    async def test_ndjson_stream(self):
+        url = f"/api/files/{self.uploaded_file.id}/stats/"
+        expected = (await self.async_client.get(url)).json()
+
+        response = await self.async_client.get(url, ACCEPT="application/x-ndjson")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) async for line in response.streaming_content]
+        self.assertEqual(lines[0], {"type": "file_info", **expected["file_info"]})
+        self.assertEqual(lines[-1], {"type": "metadata", **expected["metadata"]})
+        sections = lines[1:-1]
+        self.assertEqual([s["year"] for s in sections], expected["metadata"]["years"])
+        for section, tiers, sectors, companies in zip(
+            sections, expected["tiers"], expected["sectors"], expected["companies"]
+        ):
+            self.assertEqual({"year": section["year"], **section["tiers"]}, tiers)
+            self.assertEqual(section["companies"], companies["companies"])
+            # o payload completo tem todos os setores, com 0 nos anos em que não aparecem
+            self.assertEqual({k: section["sectors"].get(k, 0) for k in sectors if k != "year"},
+                             {k: v for k, v in sectors.items() if k != "year"})
+
+    def test_ndjson_stream_under_wsgi(self):
+        url = f"/api/files/{self.uploaded_file.id}/stats/"
+        expected = self.client.get(url).json()
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            response = self.client.get(url, {"format": "ndjson"})
+            lines = [json.loads(line) for line in response.streaming_content]
+
+        self.assertEqual(caught, [])
+        self.assertEqual(lines[0], {"type": "file_info", **expected["file_info"]})
+        self.assertEqual([line["year"] for line in lines[1:-1]], expected["metadata"]["years"])
+
+    def test_gzip_compression(self):
+        url = f"/api/files/{self.uploaded_file.id}/stats/"
+        plain = self.client.get(url)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_patch_updates_stats_incrementally(self):
+        materialize_stats(self.uploaded_file)
+        rows_before = CompanyEmissions.objects.count()
+        patch = make_workbook([
+            row("Empresa 1", "Setor 9", 12.3, 3.7, 2019),
+            row("Empresa 99", "Setor 7", 8.1, 0.45, 2020),
+            row("Empresa 3", "Setor 1", 4.2, 1.1, 2025),
+        ])
+
+        response = self.client.post(
+            f"/api/files/{self.uploaded_file.id}/patch/", {"file": patch}, format="multipart"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["records_created"], 3)
+        self.assertEqual(response.data["records_replaced"], 1)
+        self.assertEqual(response.data["years"], ["2019", "2020", "2025"])
+        self.assertEqual(CompanyEmissions.objects.count(), rows_before + 2)
+        payload = json.loads(FileStats.objects.get(file=self.uploaded_file).payload)
+        expected = compute_stats(self.uploaded_file.id)
+        # os setores são atualizados por diferença: iguais só a menos dos últimos bits
+        sectors, expected_sectors = payload.pop("sectors"), expected.pop("sectors")
+        self.assertEqual(payload, expected)
+        self.assertEqual([s.keys() for s in sectors], [s.keys() for s in expected_sectors])
+        for year_sectors, expected_year in zip(sectors, expected_sectors):
+            for key, value in expected_year.items():
+                if key != "year":
+                    self.assertAlmostEqual(year_sectors[key], value, places=6)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.uploaded_file = UploadedFile.objects.create(name="cache.xlsx")
+        emission(self.uploaded_file, "A", "Industria", 10.0, 1.0, 2020).save()
+
+    def test_stats_conditional_get(self):
+        url = f"/api/files/{self.uploaded_file.id}/stats/"
+        first = self.client.get(url)
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+
+    def test_history_invalidated_by_upload_and_delete(self):
+        etag = self.client.get("/api/files/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/upload-file/", {
+                "file": make_workbook([row("B", "Industria", 1.0, 1.0, 2021)]),
+            }, format="multipart")
+        after_upload = self.client.get("/api/files/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(after_upload.status_code, 200)
+        self.assertEqual(len(after_upload.json()), 2)
+
+        self.client.delete(f"/api/files/{self.uploaded_file.id}/delete/")
+        self.assertEqual(len(self.client.get("/api/files/").json()), 1)
+        self.assertEqual(self.client.get(f"/api/files/{self.uploaded_file.id}/stats/").status_code, 404)
+
+    def test_response_built_during_invalidation_is_not_served(self):
+        builds = []
+
+        async def build():
+            builds.append(len(builds))
+            if len(builds) == 1:
+                # um upload termina enquanto a resposta é construída
+                invalidate_history()
+            return json_response(builds)
+
+        request = RequestFactory().get("/api/files/")
+        for _ in range(3):
+            async_to_sync(cached_response)(request, HISTORY_KEY, build, HISTORY_SCOPE)
+
+        # a primeira resposta não é reutilizada; a segunda já fica em cache
+        self.assertEqual(builds, [0, 1])
+
+
+class ImmediateExecutor:
+    """Runs background jobs in the test thread, inside the test transaction."""
+    def submit(self, fn, task, *args):
+        # `fn` fecharia a ligação à base de dados do teste
+        task(*args)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FileDeleteTests(TestCase):
+    def test_delete_hides_file_and_purges_in_background(self):
+        uploaded_file = UploadedFile.objects.create(name="delete.xlsx")
+        CompanyEmissions.objects.bulk_create([
+            emission(uploaded_file, f"E{i}", "Industria", 1.0, 1.0, 2020) for i in range(5)
+        ])
+        other = UploadedFile.objects.create(name="other.xlsx")
+        emission(other, "E0", "Industria", 1.0, 1.0, 2020).save()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.delete(f"/api/files/{uploaded_file.id}/delete/")
+
+        # escondido logo, as linhas só são removidas pelo worker
+        uploaded_file.refresh_from_db()
+        self.assertTrue(uploaded_file.hidden)
+        self.assertEqual(CompanyEmissions.objects.filter(file=uploaded_file).count(), 5)
+        self.assertEqual(self.client.get(f"/api/files/{uploaded_file.id}/stats/").status_code, 404)
+        self.assertEqual(self.client.delete(f"/api/files/{uploaded_file.id}/delete/").status_code, 404)
+
+        with mock.patch("emissions.jobs.get_executor", return_value=ImmediateExecutor()):
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(UploadedFile.objects.filter(pk=uploaded_file.pk).exists())
+        self.assertEqual(CompanyEmissions.objects.filter(file=other).count(), 1)
+        self.assertEqual(CompanyEmissions.objects.count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, EMISSIONS_IMPORT_DIR=tempfile.mkdtemp())
+class ImportJobTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def upload(self, rows):
+        with mock.patch("emissions.jobs.get_executor", return_value=ImmediateExecutor()):
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    "/api/upload-file/?async=1", {"file": make_workbook(rows)}, format="multipart"
+                )
+
+    def test_async_upload_reports_progress_and_file(self):
+        response = self.upload([
+            row("A", "Industria", 10.0, 1.0, 2020),
+            row("B", "Industria", np.nan, 2.0, 2020),
+        ])
+        self.assertEqual(response.status_code, 202)
+
+        job = self.client.get(f"/api/jobs/{response.data['job_id']}/").data
+        self.assertEqual(job["status"], ImportJob.SUCCEEDED)
+        self.assertEqual(job["rows_processed"], 2)
+        self.assertEqual(job["rows_rejected"], 1)
+        self.assertEqual(CompanyEmissions.objects.filter(file_id=job["file_id"]).count(), 1)
+        self.assertTrue(FileStats.objects.filter(file_id=job["file_id"]).exists())
+        self.assertEqual([f["id"] for f in self.client.get("/api/files/").json()], [job["file_id"]])
+
+    def test_failed_job_keeps_error_and_no_file(self):
+        response = self.upload([{"Empresa": "A"}])
+
+        job = ImportJob.objects.get(pk=response.data["job_id"])
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn("Missing required columns", job.error)
+        self.assertIsNone(job.file)
+        self.assertFalse(UploadedFile.objects.exists())
+
+    def test_running_job_hides_file(self):
+        uploaded_file = UploadedFile.objects.create(name="partial.xlsx")
+        ImportJob.objects.create(name="partial.xlsx", source="x", status=ImportJob.RUNNING, file=uploaded_file)
+
+        self.assertEqual(self.client.get("/api/files/").json(), [])
+        self.assertEqual(self.client.get(f"/api/files/{uploaded_file.id}/stats/").status_code, 404)
+
+    def test_duplicate_job_purges_its_copy(self):
+        rows = [row("A", "Industria", 10.0, 1.0, 2020), row("B", "Servicos", 5.0, 2.0, 2020)]
+        first = self.upload(rows).data["job_id"]
+        second = self.upload(list(reversed(rows))).data["job_id"]
+
+        original = ImportJob.objects.get(pk=first).file
+        job = ImportJob.objects.get(pk=second)
+        self.assertEqual(job.status, ImportJob.SUCCEEDED)
+        self.assertEqual(job.file, original)
+        self.assertEqual(UploadedFile.objects.count(), 1)
+        self.assertEqual(CompanyEmissions.objects.count(), 2)
+
+    def test_recover_stale_jobs(self):
+        source = get_storage().save("stale.xlsx", make_workbook([row("A", "Industria", 1.0, 1.0, 2020)]))
+        uploaded_file = UploadedFile.objects.create(name="stale.xlsx")
+        emission(uploaded_file, "A", "Industria", 1.0, 1.0, 2020).save()
+        stale = ImportJob.objects.create(name="stale.xlsx", source=source, status=ImportJob.RUNNING, file=uploaded_file)
+        fresh = ImportJob.objects.create(name="fresh.xlsx", source="fresh.xlsx")
+        ImportJob.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(recover_stale_jobs(), [stale.pk])
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ImportJob.FAILED)
+        self.assertIsNone(stale.file)
+        self.assertFalse(UploadedFile.objects.exists())
+        self.assertFalse(CompanyEmissions.objects.exists())
+        self.assertFalse(get_storage().exists(source))
+        self.assertEqual(ImportJob.objects.get(pk=fresh.pk).status, ImportJob.PENDING)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CompanyEmissionsListViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.uploaded_file = UploadedFile.objects.create(name="list.xlsx")
+        CompanyEmissions.objects.bulk_create([
+            emission(self.uploaded_file, f"Empresa {i}", "Industria" if i % 2 else "Servicos",
+                     float(i), float(i % 5), 2020 + i % 2)
+            for i in range(25)
+        ])
+        self.url = f"/api/files/{self.uploaded_file.id}/emissions/"
+
+    def test_cursor_pagination_walks_every_row_in_order(self):
+        seen = []
+        url = self.url + "?page_size=10"
+        while url:
+            page = self.client.get(url).data
+            seen.extend(page["results"])
+            url = page["next"]
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len({r["id"] for r in seen}), 25)
+        emissions = [r["co2_emissions"] for r in seen]
+        self.assertEqual(emissions, sorted(emissions, reverse=True))
+
+    def test_filters_and_ordering(self):
+        response = self.client.get(self.url, {
+            "year": 2021, "sector": "Industria", "name": "Empresa 1", "ordering": "energy_consumption",
+        })
+
+        results = response.data["results"]
+        self.assertEqual([r["company"] for r in results], [f"Empresa {i}" for i in (1, 11, 13, 15, 17, 19)])
+        self.assertTrue(all(r["sector"] == "Industria" for r in results))
+
+    def test_missing_file(self):
+        self.assertEqual(self.client.get("/api/files/999/emissions/").status_code, 404)
+
+    def test_stats_without_companies(self):
+        response = self.client.get(f"/api/files/{self.uploaded_file.id}/stats/?companies=0")
+
+        self.assertNotIn("companies", response.json())
+        self.assertNotIn("company_list", response.json()["metadata"])
+        self.assertEqual(response.json()["metadata"]["company_count"], 25)
+        full = self.client.get(f"/api/files/{self.uploaded_file.id}/stats/")
+        self.assertIn("companies", full.json())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TopCompaniesViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.uploaded_file = UploadedFile.objects.create(name="top.xlsx")
+        CompanyEmissions.objects.bulk_create([
+            emission(self.uploaded_file, "A", "Industria", 100.0, 10.0, 2020),
+            emission(self.uploaded_file, "A", "Servicos", 100.0, 30.0, 2020),
+            emission(self.uploaded_file, "B", "Industria", 10.0, 20.0, 2020),
+            emission(self.uploaded_file, "C", "Servicos", 0.0, 5.0, 2020),
+            emission(self.uploaded_file, "D", "Industria", 50.0, 1.0, 2021),
+        ])
+        self.url = f"/api/files/{self.uploaded_file.id}/top/"
+
+    def ranking(self, **params):
+        return [(r["name"], r["year"]) for r in self.client.get(self.url, params).data["results"]]
+
+    def test_ranks_by_each_metric(self):
+        self.assertEqual(self.ranking(limit=2), [("A", "2020"), ("B", "2020")])
+        self.assertEqual(self.ranking(metric="energy", limit=2), [("A", "2020"), ("D", "2021")])
+        # C não tem consumo: intensidade indefinida, fica no fim
+        self.assertEqual(
+            self.ranking(metric="intensity"),
+            [("B", "2020"), ("A", "2020"), ("D", "2021"), ("C", "2020")],
+        )
+
+    def test_filters_by_year_and_sector(self):
+        response = self.client.get(self.url, {"year": 2020, "sector": "Industria"})
+
+        self.assertEqual([r["name"] for r in response.data["results"]], ["B", "A"])
+        self.assertEqual(response.data["results"][1]["emissions"], 10.0)
+
+    def test_labels_company_with_its_main_sector(self):
+        results = self.client.get(self.url, {"limit": 1}).data["results"]
+
+        # A tem 10 t na Industria e 30 t nos Servicos
+        self.assertEqual((results[0]["name"], results[0]["sector"]), ("A", "Servicos"))
+
+    def test_rejects_unknown_metric(self):
+        self.assertEqual(self.client.get(self.url, {"metric": "water"}).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FileComparisonViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.first = UploadedFile.objects.create(name="2021.xlsx")
+        self.second = UploadedFile.objects.create(name="2022.xlsx")
+        CompanyEmissions.objects.bulk_create([
+            emission(self.first, "A", "Industria", 100.0, 10.0, 2020),
+            emission(self.first, "A", "Industria", 110.0, 20.0, 2021),
+            emission(self.first, "B", "Servicos", 50.0, 5.0, 2021),
+            # o ficheiro mais recente corrige 2021 e acrescenta 2022
+            emission(self.second, "A", "Industria", 120.0, 30.0, 2021),
+            emission(self.second, "A", "Industria", 150.0, 40.0, 2022),
+        ])
+
+    def test_company_deltas_and_trends(self):
+        response = self.client.get("/api/compare/", {
+            "files": f"{self.second.id},{self.first.id}", "by": "company",
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([f["id"] for f in response.data["files"]], [self.first.id, self.second.id])
+        a, b = response.data["results"]
+        self.assertEqual(a["deltas"][0]["emissions"], 40.0)
+        self.assertAlmostEqual(a["deltas"][0]["emissions_pct"], 4 / 3)
+        self.assertEqual(
+            [(y["year"], y["emissions"]) for y in a["by_year"]],
+            [("2020", 10.0), ("2021", 30.0), ("2022", 40.0)],
+        )
+        self.assertIsNone(a["by_year"][0]["emissions_yoy"])
+        self.assertEqual(a["by_year"][1]["emissions_yoy"], 2.0)
+        self.assertAlmostEqual(a["emissions_cagr"], 1.0)
+        self.assertEqual(b["deltas"][0]["emissions_pct"], -1.0)
+        self.assertIsNone(b["emissions_cagr"])
+
+    def test_requires_existing_files(self):
+        response = self.client.get("/api/compare/", {"files": f"{self.first.id},999"})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get("/api/compare/", {"files": "1"}).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QuantileSketchTests(TestCase):
+    def test_small_inputs_are_exact(self):
+        values = np.random.default_rng(3).lognormal(4, 1.5, 50)
+
+        digest = TDigest().update(values)
+
+        np.testing.assert_allclose(digest.percentile([0, 10, 50, 75, 100]), np.percentile(values, [0, 10, 50, 75, 100]))
+
+    def test_merged_sketches_match_exact_percentiles(self):
+        values = np.random.default_rng(4).lognormal(4, 1.5, 200_000)
+        # um digest por "ficheiro", juntados no fim
+        digest = TDigest()
+        for part in np.array_split(values, 9):
+            digest.merge(TDigest().update(part))
+
+        self.assertLessEqual(len(digest.means), 100)
+        ordered = np.sort(values)
+        for p in (10, 50, 75, 90):
+            estimate = digest.percentile(p)
+            rank = np.searchsorted(ordered, estimate) / len(values)
+            self.assertAlmostEqual(rank, p / 100, delta=0.005)
+            self.assertAlmostEqual(estimate / np.percentile(values, p), 1, delta=0.01)
+
+    def test_thresholds_endpoint(self):
+        client = APIClient()
+        files = []
+        for i in range(2):
+            rows = [row(f"Empresa {j}", "Industria", float(j + i), float(j * 2 + i), 2020 + j % 2) for j in range(20)]
+            files.append(client.post(
+                "/api/upload-file/", {"file": make_workbook(rows, f"{i}.xlsx")}, format="multipart"
+            ).data["file_id"])
+        self.assertEqual(QuantileSketch.objects.count(), 4)
+
+        response = client.get("/api/tiers/", {"files": ",".join(map(str, files)), "years": "2020"})
+
+        self.assertEqual(response.status_code, 200)
+        emissions = CompanyEmissions.objects.filter(year=2020).values_list("co2_emissions", flat=True)
+        high, medium = np.percentile(list(emissions), [75, 50])
+        self.assertEqual([y["year"] for y in response.data["years"]], ["2020"])
+        self.assertEqual(response.data["companies"], 20)
+        self.assertAlmostEqual(response.data["thresholds"]["co2"]["high"], high)
+        self.assertAlmostEqual(response.data["thresholds"]["co2"]["medium"], medium)
+        self.assertEqual(client.get("/api/tiers/", {"files": "999"}).status_code, 404)
+
+    def test_sketches_built_on_first_request(self):
+        # ficheiro anterior aos sketches: tem linhas mas nenhum QuantileSketch
+        uploaded_file = UploadedFile.objects.create(name="old.xlsx")
+        CompanyEmissions.objects.bulk_create([
+            emission(uploaded_file, f"Empresa {i}", "Industria", float(i), float(i), 2020) for i in range(8)
+        ])
+
+        response = APIClient().get("/api/tiers/", {"files": uploaded_file.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["companies"], 8)
+        self.assertAlmostEqual(response.data["thresholds"]["co2"]["high"], np.percentile(range(8), 75))
+        self.assertEqual(QuantileSketch.objects.filter(file=uploaded_file).count(), 1)
+
+    def test_thresholds_without_matching_sketches(self):
+        uploaded_file = UploadedFile.objects.create(name="empty.xlsx")
+
+        for params in ({"files": uploaded_file.id}, {"files": uploaded_file.id, "years": "1999"}):
+            response = APIClient().get("/api/tiers/", params)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["years"], [])
+            self.assertEqual(response.data["companies"], 0)
+            self.assertEqual(response.data["thresholds"]["co2"], {"high": None, "medium": None})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImportEmissionsCommandTests(TransactionTestCase):
+    def test_imports_directory_and_resumes(self):
+        rows = [row("A", "Industria", 100.0, 10.0, 2020), row("B", "Servicos", 50.0, 5.0, 2021)]
+        with tempfile.TemporaryDirectory() as directory:
+            pd.DataFrame(rows).to_csv(os.path.join(directory, "2020.csv"), index=False)
+            pd.DataFrame(rows[::-1]).to_csv(os.path.join(directory, "2020-copy.csv"), index=False)
+            pd.DataFrame([rows[0]]).to_excel(os.path.join(directory, "2021.xlsx"), index=False)
+            with open(os.path.join(directory, "notes.csv"), "w") as f:
+                f.write("a,b\n1,2\n")
+
+            out = StringIO()
+            with self.assertRaises(CommandError):
+                call_command("import_emissions", directory, workers=1, stdout=out, stderr=StringIO())
+
+            self.assertEqual(UploadedFile.objects.count(), 2)
+            self.assertEqual(CompanyEmissions.objects.count(), 3)
+            self.assertEqual(FileStats.objects.count(), 2)
+            # o CSV com as mesmas linhas noutra ordem fica como alias
+            self.assertEqual(UploadAlias.objects.count(), 1)
+
+            os.remove(os.path.join(directory, "notes.csv"))
+            out = StringIO()
+            call_command("import_emissions", directory, workers=1, stdout=out)
+
+            self.assertIn("0 files", out.getvalue())
+            self.assertEqual(out.getvalue().count("already imported"), 3)
+            self.assertEqual(UploadedFile.objects.count(), 2)
+
+    def test_content_lock_on_postgresql(self):
+        with mock.patch("emissions.dedup.connection") as connection:
+            connection.vendor = "postgresql"
+            cursor = connection.cursor.return_value.__enter__.return_value
+            lock_content("ab" * 32)
+            lock_content("")
+
+        cursor.execute.assert_called_once_with("SELECT pg_advisory_xact_lock(%s)", [int("ab" * 7 + "a", 16)])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def server_timing(self, response):
+        return {entry.split(";")[0] for entry in response["Server-Timing"].split(", ")}
+
+    def test_server_timing_spans(self):
+        upload = self.client.post("/api/upload-file/", {"file": make_workbook([
+            row("A", "Industria", 100.0, 10.0, 2020),
+            row("B", "Servicos", 50.0, 5.0, 2020),
+        ])}, format="multipart")
+        file_id = upload.data["file_id"]
+        # stats guardadas antes de existirem: calculadas no pedido
+        FileStats.objects.filter(pk=file_id).delete()
+        stats = self.client.get(f"/api/files/{file_id}/stats/")
+
+        self.assertTrue({"parse", "validate", "insert", "fetch", "tier", "aggregate", "db", "total"}
+                        <= self.server_timing(upload))
+        self.assertTrue({"fetch", "tier", "aggregate", "serialize", "db", "total"} <= self.server_timing(stats))
+        self.assertRegex(stats["Server-Timing"], r'db;desc="\d+ queries, \d+ rows"')
+
+    def test_metrics_endpoint(self):
+        self.client.get("/api/files/")
+        response = self.client.get("/api/metrics/")
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'emissions_request_duration_seconds_bucket{method="GET",route="api/files/",status="200",le="+Inf"}', body
+        )
+        self.assertIn('emissions_sql_queries_total{route="api/files/"}', body)
+        self.assertEqual(self.client.get("/api/metrics/", REMOTE_ADDR="10.0.0.1").status_code, 403)
+
+    async def test_async_request(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(InstrumentationMiddleware(get_response)))
+
+        response = await AsyncClient().get("/api/files/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue({"db", "total"} <= self.server_timing(response))
+
+    def test_profile_dump(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(EMISSIONS_PROFILE_DIR=directory):
+            self.assertNotIn("X-Profile", self.client.get("/api/files/"))
+            response = self.client.get("/api/files/", {"profile": "1"})
+
+            self.assertEqual(os.listdir(directory), [response["X-Profile"]])
+
+
+class BenchmarkTests(TestCase):
+    def test_synthetic_duplicates(self):
+        frame = synthetic_dataframe(1000, companies=50, duplicates=0.2)
+
+        self.assertEqual(len(frame), 1000)
+        self.assertEqual(frame.duplicated().sum(), 200)
+        self.assertLessEqual(frame["Empresa"].nunique(), 50)
+
+    def test_find_regressions(self):
+        baseline = [
+            {"endpoint": "upload", "rows": 1000, "seconds": 1.0, "peak_memory_mb": 10.0, "queries": 20},
+            {"endpoint": "stats", "rows": 1000, "seconds": 0.01, "peak_memory_mb": 1.0, "queries": 1},
+        ]
+        results = [
+            {"endpoint": "upload", "rows": 1000, "seconds": 1.1, "peak_memory_mb": 20.0, "queries": 30},
+            # o tempo duplica mas fica abaixo do ruído de min_seconds
+            {"endpoint": "stats", "rows": 1000, "seconds": 0.02, "peak_memory_mb": 1.0, "queries": 1},
+            {"endpoint": "delete", "rows": 1000, "seconds": 5.0, "peak_memory_mb": 1.0, "queries": 5},
+        ]
+
+        regressions = find_regressions(results, baseline, threshold=0.25)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("upload (1,000 rows): peak_memory_mb"))
+        self.assertTrue(regressions[1].startswith("upload (1,000 rows): queries"))
+
+
+class LazyImportTests(TestCase):
+    def test_urls_do_not_load_analytics_stack(self):
+        # num processo novo: aqui os testes já importaram o pandas
+        code = (
+            "import sys, django; django.setup(); import backend.urls; "
+            "print(sorted({'pandas', 'numpy', 'pyarrow', 'openpyxl'} & set(sys.modules)))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=settings.BASE_DIR, env=os.environ,
+            capture_output=True, text=True, check=True,
+        ).stdout
+
+        self.assertEqual(output.strip(), "[]")
+
+    def test_deleting_archive_does_not_load_pyarrow(self):
+        # purge_file apaga o arquivo de cada ficheiro removido
+        code = (
+            "import sys, django; django.setup(); from emissions import jobs; jobs.delete_archive(0); "
+            "print(sorted({'pandas', 'numpy', 'pyarrow'} & set(sys.modules)))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=settings.BASE_DIR, env=os.environ,
+            capture_output=True, text=True, check=True,
+        ).stdout
+
+        self.assertEqual(output.strip(), "[]")
+
+    def test_lazy_module_imports_on_first_use(self):
+        from .lazy import LazyModule
+
+        module = LazyModule("emissions.stats")
+
+        self.assertIs(module.compute_stats, compute_stats)
@@ -20,7 +20,6 @@ def process_excel(file_path, file_name):
         )
     
     # calcular indicadores 
-    # !TODO: talvez criar uma tabela para os indicadores que tb aponta para uploaded_file
     total_co2 = df["Emissões CO₂ (t)"].sum()
     avg_energy = df["Consumo (kWh)"].mean()
     top_5_co2 = df.nlargest(5, "Emissões CO₂ (t)")[["Nome da Empresa", "Emissões CO₂ (t)"]].to_dict("records")
@@ -1,40 +1,53 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import UploadedFile, CompanyEmissions
-import pandas as pd
-from io import BytesIO
-from .models import UploadedFile, CompanyEmissions
-from collections import defaultdict
-from django.db.models import Avg
-import numpy as np
-import re 
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.generics import ListAPIView
+from rest_framework.pagination import CursorPagination
+from .models import UploadedFile, CompanyEmissions, FileStats, ImportJob, QuantileSketch, UploadAlias
 from django.db import transaction
+from django.db.models import Exists, OuterRef
+from .jobs import create_import_job, hide_file, ready_files
+from .instrumentation import render_metrics, span
+from .lazy import LazyModule
+from .paths import delete_archive
+from .serializers import CompanyEmissionsSerializer, ImportJobSerializer
+from .cache import (
+    HISTORY_KEY, HISTORY_SCOPE, cached_response, file_scope, invalidate_file, invalidate_history,
+    json_response, stats_key,
+)
 
+# Módulos que importam pandas/numpy/pyarrow: só são carregados quando um view precisa deles
+archive = LazyModule('emissions.archive')
+dedup = LazyModule('emissions.dedup')
+ingestion = LazyModule('emissions.ingestion')
+loaders = LazyModule('emissions.loaders')
+patches = LazyModule('emissions.patches')
+sketches = LazyModule('emissions.sketches')
+stats = LazyModule('emissions.stats')
 
-def natural_sort_key(s):
-    """
-    Natural sorting key function.
-
-    This function returns a list of strings and integers obtained by
-    splitting the input string `s` at each sequence of digits. The
-    strings are converted to lower case and the integers are converted
-    to integers. This allows strings to be sorted in a natural way (i.e.,
-    "file2.txt" comes after "file10.txt").
-
-    Args:
-        s (str): The string to be sorted.
-
-    Returns:
-        list: A list of strings and integers representing the natural
-            sorting key of `s`.
-    """
-    return [int(text) if text.isdigit() else text.lower() 
-            for text in re.split('([0-9]+)', s)]
 
 class FileUploadView(APIView):
     """
-    Process an uploaded Excel file and store its contents in the database.
+    Process an uploaded Excel (or CSV) file and store its contents in the database.
+
+    The file is streamed in fixed-size chunks, so memory use stays flat
+    regardless of the file size. With `?async=1` the import runs in a
+    background worker and a 202 with the job ID is returned instead.
+
+    Re-uploading a file that was already imported doesn't store its rows
+    again: a byte-identical file is recognised by its SHA-256 before it
+    is parsed, and a file with the same rows in a different form (CSV
+    instead of Excel, reordered rows) by its content hash once parsed.
+    Either way an `UploadAlias` is recorded and the existing `file_id`
+    is returned with `"duplicate": true`.
     
     Expected Excel columns:
     - Empresa (string)
@@ -44,14 +57,7 @@ class FileUploadView(APIView):
     - Ano (integer)
     """
     
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-    REQUIRED_COLUMNS = {
-        "Empresa",
-        "Setor",
-        "Consumo de Energia (MWh)",
-        "Emissões de CO2 (toneladas)",
-        "Ano"
-    }
+    MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
 
     def post(self, request):
         # Validate file exists and is within size limit
@@ -65,55 +71,72 @@ class FileUploadView(APIView):
                 status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
             )
 
+        if not file_obj.size:
+            return Response({"error": "Empty file provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Ficheiro igual a um já importado: devolve o existente sem o ler
+        sha256 = dedup.file_sha256(file_obj)
+        duplicate = dedup.find_duplicate(ready_files(), sha256=sha256)
+        if duplicate:
+            return self.duplicate_response(duplicate, file_obj.name, sha256)
+
+        # Background import: return right away and let the client poll /api/jobs/<id>/
+        if request.query_params.get('async') in ('1', 'true'):
+            job = create_import_job(file_obj)
+            return Response(
+                {"status": job.status, "job_id": job.id},
+                status=status.HTTP_202_ACCEPTED
+            )
+
         try:
-            # Read file content into memory
-            file_content = file_obj.read()
-            if not file_content:
-                return Response({"error": "Empty file provided"}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Try multiple Excel engines
-            excel_file = BytesIO(file_content)
-            for engine in ['openpyxl', 'xlrd']:
-                try:
-                    df = pd.read_excel(excel_file, engine=engine)
-                    break
-                except Exception as e:
-                    continue
-            else:
-                raise ValueError("File is not a valid Excel document or is corrupted")
+            # Only the header is read here, rows are streamed in chunks below
+            with span('parse'):
+                columns, chunks = ingestion.open_table(file_obj)
 
             # Validate columns
-            missing_columns = self.REQUIRED_COLUMNS - set(df.columns)
-            if missing_columns:
-                return Response(
-                    {"error": f"Missing required columns: {', '.join(missing_columns)}"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Clean data
-            df = df.dropna(subset=['Emissões de CO2 (toneladas)', 'Ano'])
-            df['Ano'] = pd.to_numeric(df['Ano'], errors='coerce').astype('Int64')
-
-            # Create records
-            with transaction.atomic():
-                uploaded_file = UploadedFile.objects.create(name=file_obj.name)
-                
-                CompanyEmissions.objects.bulk_create([
-                    CompanyEmissions(
-                        file=uploaded_file,
-                        name=str(row['Empresa']),
-                        sector=str(row['Setor']),
-                        energy_consumption=float(row['Consumo de Energia (MWh)']),
-                        co2_emissions=float(row['Emissões de CO2 (toneladas)']),
-                        year=int(row['Ano'])
-                    ) for _, row in df.iterrows() if not pd.isna(row['Ano'])
-                ])
+            ingestion.check_columns(columns)
+
+            # Clean and create records chunk by chunk (invalid rows are counted and skipped)
+            digest = dedup.ContentDigest()
+            uploaded_file = None
+            try:
+                with transaction.atomic():
+                    uploaded_file = UploadedFile.objects.create(
+                        name=file_obj.name, sha256=sha256, storage=archive.get_storage_mode()
+                    )
+                    created, rejected, rejected_by_column = loaders.load_chunks(
+                        chunks, uploaded_file, digest=digest
+                    )
+                    content_hash = digest.hexdigest()
+                    dedup.lock_content(content_hash)
+                    duplicate = dedup.find_duplicate(
+                        ready_files().exclude(pk=uploaded_file.pk), content_hash=content_hash
+                    )
+                    if duplicate:
+                        # mesmos dados noutro formato: desfaz a importação
+                        transaction.set_rollback(True)
+                        delete_archive(uploaded_file.pk)
+                    else:
+                        uploaded_file.content_hash = content_hash
+                        uploaded_file.save(update_fields=['content_hash'])
+                        stats.materialize_stats(uploaded_file)
+                        transaction.on_commit(invalidate_history)
+            except Exception:
+                # a transação foi desfeita, mas o archive Parquet já estava escrito
+                if uploaded_file is not None:
+                    delete_archive(uploaded_file.pk)
+                raise
 
+            if duplicate:
+                return self.duplicate_response(duplicate, file_obj.name, sha256)
 
             return Response({
                 "status": "success",
                 "file_id": uploaded_file.id,
-                "records_created": len(df),
+                "records_created": created,
+                "records_rejected": rejected,
+                "rejected_by_column": rejected_by_column,
+                "duplicate": False,
             })
 
         except ValueError as e:
@@ -129,19 +152,126 @@ class FileUploadView(APIView):
                 },
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY
             )
-class FileHistoryView(APIView):
-    def get(self, request):
+
+    def duplicate_response(self, uploaded_file, name, sha256):
+        UploadAlias.objects.create(file=uploaded_file, name=name, sha256=sha256)
+        return Response({
+            "status": "success",
+            "file_id": uploaded_file.id,
+            "records_created": 0,
+            "records_rejected": 0,
+            "rejected_by_column": {},
+            "duplicate": True,
+        })
+
+
+class FilePatchView(APIView):
+    """
+    Upsert the rows of a small correction file into an existing file.
+
+    Patch rows replace the existing rows with the same year, company and
+    sector; other rows are kept. The stored stats are updated from the
+    affected companies only (see `apply_patch`), so a correction to a
+    large file doesn't recompute its stats from scratch.
+    """
+
+    MAX_FILE_SIZE = FileUploadView.MAX_FILE_SIZE
+
+    def post(self, request, file_id):
+        if 'file' not in request.FILES:
+            return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_obj = request.FILES['file']
+        if file_obj.size > self.MAX_FILE_SIZE:
+            return Response(
+                {"error": f"File exceeds {self.MAX_FILE_SIZE/1e6}MB limit"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        if not file_obj.size:
+            return Response({"error": "Empty file provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not ready_files().filter(pk=file_id).exists():
+            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            columns, chunks = ingestion.open_table(file_obj)
+            ingestion.check_columns(columns)
+
+            with transaction.atomic():
+                # um patch de cada vez por ficheiro
+                uploaded_file = UploadedFile.objects.select_for_update().get(pk=file_id)
+                if uploaded_file.storage == UploadedFile.PARQUET:
+                    return Response(
+                        {"error": "The rows of this file are only stored in Parquet and can't be patched"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                result = patches.apply_patch(uploaded_file, chunks)
+                transaction.on_commit(lambda: invalidate_file(file_id))
+
+            return Response({
+                "status": "success",
+                "file_id": file_id,
+                "records_created": result['created'],
+                "records_replaced": result['replaced'],
+                "records_rejected": result['rejected'],
+                "rejected_by_column": result['rejected_by_column'],
+                "years": result['years'],
+            })
+
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {
+                    "error": "File processing failed",
+                    "detail": str(e)
+                },
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+
+class AsyncJSONView(View):
+    """
+    Base class for the async endpoints.
+
+    DRF's `APIView` can't run `async` handlers, so these are plain Django
+    views. Responses are rendered with DRF's `JSONRenderer`, so they are
+    byte-for-byte the same as the `APIView` ones, and like `APIView` the
+    views are CSRF exempt.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+
+class FileHistoryView(AsyncJSONView):
+    async def get(self, request):
         """
         Return a list of uploaded files with their IDs, names, and upload dates.
 
         Files are ordered by upload date, with the most recent file first.
+        The list is cached until a file is uploaded or deleted.
         """
         
-        files = UploadedFile.objects.all().values("id", "name", "upload_date")
-        return Response(files)
+        return await cached_response(request, HISTORY_KEY, self.build_response, HISTORY_SCOPE)
 
-class FileStatsView(APIView):
-    def get(self, request, file_id):
+    async def build_response(self):
+        files = [f async for f in ready_files().values("id", "name", "upload_date")]
+        return json_response(files)
+
+
+# Content types aceites para o formato colunar (MessagePack)
+MSGPACK_CONTENT_TYPE = 'application/vnd.msgpack'
+MSGPACK_ACCEPT = (MSGPACK_CONTENT_TYPE, 'application/msgpack', 'application/x-msgpack')
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+class FileStatsView(AsyncJSONView):
+    async def get(self, request, file_id):
         """
         Return the emissions and energy consumption data for the given file ID.
 
@@ -153,122 +283,329 @@ class FileStatsView(APIView):
         * `companies`: A list of dictionaries, each containing the year and a list of dictionaries for each company, containing the company name, emissions, consumption, and sector.
         * `metadata`: A dictionary containing the list of years, sectors, and companies in the file, as well as the total number of companies.
 
+        The payload is computed once at upload time and stored in `FileStats`,
+        so this is a single primary-key lookup. Responses are also cached
+        (with ETag/Last-Modified) until the file is deleted. Decoding and
+        rendering the payload run in a worker thread, so large files don't
+        block the event loop.
+
+        With `?companies=0` the per-company breakdown (`companies` and
+        `metadata.company_list`) is left out; use `/api/files/<id>/emissions/`
+        to page through companies instead.
+
+        Clients sending `Accept: application/vnd.msgpack` (or `?format=msgpack`)
+        get a compact columnar MessagePack encoding instead of the JSON
+        payload; see `columnar_stats` for its layout.
+
+        Clients sending `Accept: application/x-ndjson` (or `?format=ndjson`)
+        get the stats streamed year by year as newline-delimited JSON, read
+        straight from the file's rows so memory stays bounded by one year;
+        see `stream_stats`. The lines are sent as they are computed under
+        both WSGI and ASGI. Streamed responses aren't cached.
+
         :param file_id: The ID of the file to retrieve data for.
         :return: A JSON response containing the requested data.
         """
+        summary = request.GET.get('companies') in ('0', 'false')
+        fmt = self.negotiate_format(request)
+        if fmt == 'ndjson':
+            return await self.stream_response(request, file_id, summary)
+        response = await cached_response(
+            request, stats_key(file_id, summary, fmt), lambda: self.build_response(file_id, summary, fmt),
+            file_scope(file_id),
+        )
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+    def negotiate_format(self, request):
+        if request.GET.get('format') in ('msgpack', 'ndjson'):
+            return request.GET['format']
+        accept = request.headers.get('Accept', '')
+        if NDJSON_CONTENT_TYPE in accept:
+            return 'ndjson'
+        return 'msgpack' if any(t in accept for t in MSGPACK_ACCEPT) else 'json'
+
+    async def stream_response(self, request, file_id, summary=False):
         try:
-            uploaded_file = UploadedFile.objects.get(pk=file_id)
+            uploaded_file = await ready_files().aget(pk=file_id)
         except UploadedFile.DoesNotExist:
+            return json_response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        lines = stats.stream_stats(uploaded_file, summary)
+        if not isinstance(request, ASGIRequest):
+            # WSGI (runserver, gunicorn) consome o iterador síncrono na thread do pedido
+            content = lines
+        else:
+            async def content():
+                # cada ano é lido e calculado numa thread, sem bloquear o event loop
+                next_line = sync_to_async(next)
+                while (line := await next_line(lines, None)) is not None:
+                    yield line
+
+            content = content()
+
+        response = StreamingHttpResponse(content, content_type=NDJSON_CONTENT_TYPE)
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+    async def build_response(self, file_id, summary=False, fmt='json'):
+        try:
+            with span('fetch'):
+                file_stats = await FileStats.objects.select_related('file').aget(pk=file_id)
+        except FileStats.DoesNotExist:
+            # Files uploaded before stats were stored are computed once and kept
+            try:
+                uploaded_file = await ready_files().aget(pk=file_id)
+            except UploadedFile.DoesNotExist:
+                return json_response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+            file_stats = await sync_to_async(stats.materialize_stats)(uploaded_file)
+
+        # trabalho de CPU (json.loads + render), corre fora do event loop
+        content = await sync_to_async(stats.render_stats, thread_sensitive=False)(file_stats, summary, fmt)
+        content_type = MSGPACK_CONTENT_TYPE if fmt == 'msgpack' else 'application/json'
+        return HttpResponse(content, content_type=content_type)
+
+
+def archive_only_response(uploaded_files):
+    """
+    A 400 response if any of the files keeps its rows only in Parquet.
+
+    The row-level endpoints (rows, top-N, comparison) query
+    `CompanyEmissions`, which has no rows for those files.
+    """
+    archived = sorted(f.id for f in uploaded_files if f.storage == UploadedFile.PARQUET)
+    if not archived:
+        return None
+    return Response(
+        {"error": f"The rows of files {', '.join(map(str, archived))} are only stored in Parquet "
+                  "and this endpoint needs them in the database"},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+class CompanyEmissionsCursorPagination(CursorPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-co2_emissions'
+
+    def get_ordering(self, request, queryset, view):
+        # id como desempate, para a ordem ser determinística entre páginas
+        return (*super().get_ordering(request, queryset, view), 'id')
+
+
+class CompanyEmissionsListView(ListAPIView):
+    """
+    Page through the rows of a file with keyset (cursor) pagination.
+
+    Query parameters:
+    - year: only rows for this year
+    - sector: only rows for this sector (exact name)
+    - name: only companies whose name starts with this prefix
+    - ordering: `co2_emissions` or `energy_consumption`, prefixed with `-`
+      for descending order (default `-co2_emissions`)
+    - page_size: rows per page (max 1000)
+    - cursor: the opaque cursor from the `next`/`previous` links
+    """
+    serializer_class = CompanyEmissionsSerializer
+    pagination_class = CompanyEmissionsCursorPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['co2_emissions', 'energy_consumption']
+    ordering = ['-co2_emissions']
+
+    def list(self, request, file_id):
+        uploaded_file = ready_files().filter(pk=file_id).first()
+        if uploaded_file is None:
             return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        return archive_only_response([uploaded_file]) or super().list(request, file_id)
 
-        queryset = CompanyEmissions.objects.filter(file_id=file_id)
-        
-        # Initialize data structures
-        tier_data = defaultdict(lambda: {
-            'co2_high': 0,
-            'co2_medium': 0,
-            'co2_low': 0,
-            'energy_high': 0,
-            'energy_medium': 0,
-            'energy_low': 0
+    def get_queryset(self):
+        queryset = CompanyEmissions.objects.filter(file_id=self.kwargs['file_id']).select_related('company', 'sector')
+        params = self.request.query_params
+        if params.get('year'):
+            try:
+                queryset = queryset.filter(year=int(params['year']))
+            except ValueError:
+                raise ValidationError({"year": "Must be an integer"})
+        if params.get('sector'):
+            queryset = queryset.filter(sector__name=params['sector'])
+        if params.get('name'):
+            queryset = queryset.filter(company__name__startswith=params['name'])
+        return queryset
+
+
+class TopCompaniesView(APIView):
+    MAX_LIMIT = 100
+
+    def get(self, request, file_id):
+        """
+        Return the top-N companies of a file (leaderboard).
+
+        Query parameters:
+        - metric: `emissions` (default), `energy` or `intensity` (tCO2/MWh)
+        - year: only rank companies for this year
+        - sector: only rank rows from this sector
+        - limit: number of companies to return (default 5, max 100)
+
+        Ranking happens in the database (`ORDER BY ... LIMIT`), so the
+        payload only contains the requested companies.
+        """
+        params = request.query_params
+        metric = params.get('metric', 'emissions')
+        if metric not in stats.RANKING_METRICS:
+            return Response(
+                {"error": f"metric must be one of: {', '.join(stats.RANKING_METRICS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(int(params.get('limit', 5)), self.MAX_LIMIT)
+            year = int(params['year']) if params.get('year') else None
+        except ValueError:
+            return Response({"error": "limit and year must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        uploaded_file = ready_files().filter(pk=file_id).first()
+        if uploaded_file is None:
+            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        archived = archive_only_response([uploaded_file])
+        if archived:
+            return archived
+
+        sector = params.get('sector') or None
+        return Response({
+            'metric': metric,
+            'year': year,
+            'sector': sector,
+            'limit': limit,
+            'results': stats.top_companies(file_id, metric, limit, year, sector),
         })
-        
-        sector_data = defaultdict(lambda: defaultdict(float))
-        company_data = defaultdict(lambda: defaultdict(lambda: {
-            'emissions': 0,
-            'consumption': 0,
-            'sectors': set()
-        }))
-
-        # First pass: Aggregate all data by year and company
-        for entry in queryset.values('year', 'name', 'sector', 'co2_emissions', 'energy_consumption'):
-            year = str(entry['year'])
-            company = entry['name']
-            
-            company_data[year][company]['emissions'] += entry['co2_emissions'] or 0
-            company_data[year][company]['consumption'] += entry['energy_consumption'] or 0
-            company_data[year][company]['sectors'].add(entry['sector'])
-
-        # Second pass: Calculate tiers and sectors
-        for year, companies in sorted(company_data.items(), key=lambda x: x[0]):  # Sort years
-            emissions_values = [c['emissions'] for c in companies.values()]
-            consumption_values = [c['consumption'] for c in companies.values()]
-            
-            co2_high = np.percentile(emissions_values, 75)
-            co2_medium = np.percentile(emissions_values, 50)
-            energy_high = np.percentile(consumption_values, 75)
-            energy_medium = np.percentile(consumption_values, 50)
-
-            for company, data in sorted(companies.items(), key=lambda x: x[0]):  # Sort companies
-                # CO2 Tier classification
-                if data['emissions'] >= co2_high:
-                    tier_data[year]['co2_high'] += data['emissions']
-                elif data['emissions'] >= co2_medium:
-                    tier_data[year]['co2_medium'] += data['emissions']
-                else:
-                    tier_data[year]['co2_low'] += data['emissions']
-                
-                # Energy Tier classification
-                if data['consumption'] >= energy_high:
-                    tier_data[year]['energy_high'] += data['consumption']
-                elif data['consumption'] >= energy_medium:
-                    tier_data[year]['energy_medium'] += data['consumption']
-                else:
-                    tier_data[year]['energy_low'] += data['consumption']
-                
-                # Sector data
-                for sector in data['sectors']:  # ✅ Loop through all sectors
-                    sector_data[year][sector] += data['emissions']
-                    sector_data[year][f"{sector}_energy"] += data['consumption']
-
-        # Prepare sorted response data
-        sorted_years = sorted(tier_data.keys())
-        sector_list = sorted({s for year in sector_data.values() for s in year.keys()})
-        company_list = sorted(
-            {c for year in company_data.values() for c in year.keys()},
-            key=natural_sort_key
-        )
-        
-        response_data = {
-            'file_info': {
-                'id': uploaded_file.id,
-                'name': uploaded_file.name,
-                'upload_date': uploaded_file.upload_date
-            },
-            'tiers': [{
-                'year': year,
-                **tier_data[year]
-            } for year in sorted_years],
-            'sectors': [{
-                'year': year,
-                **{s: sector_data[year].get(s, 0) for s in sector_list}
-            } for year in sorted_years],
-            'companies': [{
-                'year': year,
-                'companies': sorted([{
-                    'name': company,
-                    'emissions': data['emissions'],
-                    'consumption': data['consumption'],
-                    'sector': next(iter(data['sectors'])) if data['sectors'] else 'Unknown'
-                } for company, data in company_data[year].items()], key=lambda x: x['name'])
-            } for year in sorted_years],
-            'metadata': {
-                'years': sorted_years,
-                'sectors': sector_list,
-                'company_count': len(company_list),
-                'company_list': company_list
-            }
-        }
-        
-        
 
-        return Response(response_data)
-    
-class FileDeleteView(APIView):
-    def delete(self, request, file_id):
+
+class FileComparisonView(APIView):
+    MAX_FILES = 100
+
+    def get(self, request):
+        """
+        Compare emissions and energy consumption across several files.
+
+        Query parameters:
+        - files: comma-separated file IDs (at least two)
+        - by: `sector` (default) or `company`
+        - name: optional company/sector name prefix
+
+        Files are compared in upload order. For every company or sector the
+        response has its totals per file, the deltas between consecutive
+        files, a per-year series with YoY growth (the latest file wins for
+        years present in several files) and the CAGR over that series.
+        """
+        params = request.query_params
+        group_by = params.get('by', 'sector')
+        if group_by not in stats.COMPARISON_GROUPS:
+            return Response(
+                {"error": f"by must be one of: {', '.join(stats.COMPARISON_GROUPS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            file_ids = {int(i) for i in params.get('files', '').split(',') if i.strip()}
+        except ValueError:
+            return Response({"error": "files must be a comma-separated list of IDs"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 2 <= len(file_ids) <= self.MAX_FILES:
+            return Response(
+                {"error": f"Provide between 2 and {self.MAX_FILES} file IDs"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        uploaded_files = list(ready_files().filter(pk__in=file_ids).order_by('upload_date', 'id'))
+        missing = file_ids - {f.id for f in uploaded_files}
+        if missing:
+            return Response(
+                {"error": f"Files not found: {', '.join(map(str, sorted(missing)))}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        archived = archive_only_response(uploaded_files)
+        if archived:
+            return archived
+
+        return Response({
+            'files': [stats.file_info(f) for f in uploaded_files],
+            'group_by': group_by,
+            'results': stats.compare_files(uploaded_files, group_by, params.get('name') or None),
+        })
+
+
+class TierThresholdsView(APIView):
+    MAX_FILES = 100
+
+    def get(self, request):
+        """
+        Return approximate tier thresholds for one or more files combined.
+
+        Query parameters:
+        - files: comma-separated file IDs
+        - years: optional comma-separated years
+
+        Thresholds are the 75th (high) and 50th (medium) percentiles of the
+        per-company totals of each metric, per year and over all selected
+        years, estimated from the t-digests stored at upload time (see
+        `emissions/sketches.py`) instead of loading every company. Files
+        uploaded before sketches existed get theirs on the first request.
+        """
+        params = request.query_params
+        try:
+            file_ids = {int(i) for i in params.get('files', '').split(',') if i.strip()}
+            years = [int(y) for y in params.get('years', '').split(',') if y.strip()] or None
+        except ValueError:
+            return Response(
+                {"error": "files and years must be comma-separated lists of integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= len(file_ids) <= self.MAX_FILES:
+            return Response(
+                {"error": f"Provide between 1 and {self.MAX_FILES} file IDs"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        uploaded_files = list(ready_files().filter(pk__in=file_ids).annotate(
+            has_sketches=Exists(QuantileSketch.objects.filter(file=OuterRef('pk')))
+        ).order_by('upload_date', 'id'))
+        missing = file_ids - {f.id for f in uploaded_files}
+        if missing:
+            return Response(
+                {"error": f"Files not found: {', '.join(map(str, sorted(missing)))}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Ficheiros carregados antes dos sketches: calculados no primeiro pedido
+        for uploaded_file in uploaded_files:
+            if not uploaded_file.has_sketches:
+                with transaction.atomic():
+                    locked = UploadedFile.objects.select_for_update().get(pk=uploaded_file.pk)
+                    if not locked.sketches.exists():
+                        stats.backfill_sketches(locked)
+
+        return Response({
+            'files': [stats.file_info(f) for f in uploaded_files],
+            **sketches.combined_thresholds(sorted(file_ids), years),
+        })
+
+
+def delete_file(uploaded_file):
+    with transaction.atomic():
+        hide_file(uploaded_file)
+    invalidate_file(uploaded_file.id)
+
+
+class FileDeleteView(AsyncJSONView):
+    async def delete(self, request, file_id):
         """
         Deletes a file by ID.
 
+        The file is hidden right away and its rows are removed in batches
+        by a background worker (see `hide_file`), so the response time
+        doesn't depend on the size of the file.
+
         Args:
             request: The request object.
             file_id: The ID of the file to delete.
@@ -276,14 +613,47 @@ class FileDeleteView(APIView):
         Returns:
             A response object with a JSON payload containing either a success message
             or an error message.
-
-        Raises:
-            UploadedFile.DoesNotExist: If the file with the given ID does not exist.
         """
 
         try:
-            uploaded_file = UploadedFile.objects.get(id=file_id)
-            uploaded_file.delete()
-            return Response({"message": "File deleted successfully"}, status=status.HTTP_200_OK)
+            uploaded_file = await ready_files().aget(id=file_id)
         except UploadedFile.DoesNotExist:
-            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+            return json_response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        await sync_to_async(delete_file)(uploaded_file)
+        return json_response({"message": "File deleted successfully"}, status=status.HTTP_200_OK)
+
+
+class ImportJobView(APIView):
+    def get(self, request, job_id):
+        """
+        Return the progress of a background import job.
+
+        The response contains the job status (`pending`, `running`,
+        `succeeded` or `failed`), the number of rows processed and rejected
+        so far and, once the job succeeds, the resulting `file_id`.
+        """
+        try:
+            job = ImportJob.objects.get(pk=job_id)
+        except ImportJob.DoesNotExist:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ImportJobSerializer(job).data)
+
+
+# Endereços que podem ler /api/metrics/, além de settings.INTERNAL_IPS
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+class MetricsView(View):
+    def get(self, request):
+        """
+        Return the request latency histograms, per-step timings and SQL
+        counters of this process in the Prometheus text format.
+
+        Only answers requests from localhost or `INTERNAL_IPS`. Each worker
+        process keeps its own metrics.
+        """
+        address = request.META.get('REMOTE_ADDR')
+        if address not in LOCAL_ADDRESSES and address not in settings.INTERNAL_IPS:
+            return json_response({"error": "Metrics are only available locally"}, status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')